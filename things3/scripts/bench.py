@@ -0,0 +1,805 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Things 3 read path - No external dependencies required.
+Runs against a synthetic database, so Things 3 does not need to be installed.
+
+Usage:
+    python bench.py connect [--tasks N] [--calls N]
+    python bench.py decode [--tasks N]
+    python bench.py dates [--tasks N]
+    python bench.py search [--scales N,N,...] [--calls N]
+    python bench.py dashboard [--scales N,N,...] [--calls N]
+    python bench.py tags [--scales N,N,...] [--tag-count N] [--calls N]
+    python bench.py cache [--scales N,N,...] [--calls N]
+    python bench.py watch [--scales N,N,...] [--changes N,N,...] [--calls N]
+    python bench.py diff [--scales N,N,...] [--changes N] [--calls N]
+    python bench.py daemon [--scales N,N,...] [--calls N]
+    python bench.py snapshot [--scales N,N,...] [--calls N]
+    python bench.py suite [--scales N,N,...] [--calls N] [--save FILE] [--baseline FILE]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synth_db  # noqa: E402
+import things3  # noqa: E402
+from synth_db import WORDS  # noqa: E402
+
+
+# ============== SYNTHETIC DATABASE ==============
+
+def synthetic_db(tasks: int, seed: int = 0, **overrides: int) -> str:
+    """Build (or reuse) a synthetic Things database with N to-dos (see synth_db.py).
+    
+    overrides are passed to synth_db.scale_for (e.g. tags=5000).
+    """
+    suffix = "".join(f"-{key}{value}" for key, value in sorted(overrides.items()))
+    path = os.path.join(tempfile.gettempdir(), f"things3-bench-v4-{tasks}-{seed}{suffix}-{date.today()}.sqlite")
+    if not os.path.exists(path):
+        synth_db.generate(path, seed=seed, **synth_db.scale_for(tasks, **overrides))
+    return path
+
+
+# ============== HELPERS ==============
+
+def _time_calls(fn: Callable[[], object], calls: int) -> List[float]:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _report(title: str, results: Dict[str, List[float]]) -> None:
+    print(f"\n{title}")
+    print(f"{'variant':<28} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, timings in results.items():
+        p95 = _percentile(sorted(timings), 95)
+        print(f"{name:<28} {statistics.mean(timings) * 1e3:>10.3f} "
+              f"{statistics.median(timings) * 1e3:>10.3f} {p95 * 1e3:>10.3f}")
+
+
+def _legacy_things_date_to_str(things_date):
+    """_things_date_to_str before memoization (reference)."""
+    if things_date is None or things_date == 0:
+        return None
+    year = (things_date & 0b111111111110000000000000000) >> 16
+    month = (things_date & 0b000000000001111000000000000) >> 12
+    day = (things_date & 0b000000000000000111110000000) >> 7
+    if year == 0 or month == 0 or day == 0:
+        return None
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _legacy_unix_to_str(timestamp):
+    """_unix_to_str before the fast path (reference)."""
+    if timestamp is None:
+        return None
+    try:
+        return datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="seconds")
+    except (OSError, ValueError):
+        return None
+
+
+def _legacy_row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    """_row_to_dict as it was before compiled decoders (reference for bench_decode)."""
+    d = dict(row)
+    type_map = {0: "to-do", 1: "project", 2: "heading"}
+    d["type"] = type_map.get(d.get("type"), d.get("type"))
+    status_map = {0: "incomplete", 2: "canceled", 3: "completed"}
+    d["status"] = status_map.get(d.get("status"), d.get("status"))
+    start_map = {0: "Inbox", 1: "Anytime", 2: "Someday"}
+    d["start"] = start_map.get(d.get("start"), d.get("start"))
+    if "startDate" in d:
+        d["start_date"] = _legacy_things_date_to_str(d.pop("startDate"))
+    if "deadline" in d:
+        d["deadline"] = _legacy_things_date_to_str(d.get("deadline"))
+    if "creationDate" in d:
+        d["created"] = _legacy_unix_to_str(d.pop("creationDate"))
+    if "userModificationDate" in d:
+        d["modified"] = _legacy_unix_to_str(d.pop("userModificationDate"))
+    if "stopDate" in d:
+        d["stop_date"] = _legacy_unix_to_str(d.pop("stopDate"))
+    return d
+
+
+def _rate(label: str, rows: int, seconds: float, baseline: float = None) -> None:
+    speedup = f"  x{baseline / seconds:.2f}" if baseline else ""
+    print(f"{label:<28} {rows / seconds:>14,.0f} rows/s{speedup}")
+
+
+# ============== BENCHMARKS ==============
+
+def bench_connect(args: argparse.Namespace) -> None:
+    """Per-call _connect() (old behaviour) vs pooled read-only tuned connections."""
+    path = synthetic_db(args.tasks)
+    pooled = things3.ConnectionManager(path)
+    with pooled.connection() as conn:
+        uuid = conn.execute("SELECT uuid FROM TMTask WHERE type = 0 LIMIT 1 OFFSET 42").fetchone()[0]
+    queries = {
+        "point lookup": ("SELECT * FROM TMTask WHERE uuid = ?", (uuid,)),
+        "inbox scan": ("SELECT uuid, title FROM TMTask "
+                       "WHERE trashed = 0 AND status = 0 AND start = 0", ()),
+    }
+    
+    for label, (query, params) in queries.items():
+        def legacy():
+            # What every read function did before: glob, open read-write, query, close
+            conn = sqlite3.connect(things3.glob.glob(path)[0])
+            conn.row_factory = sqlite3.Row
+            conn.execute(query, params).fetchall()
+            conn.close()
+        
+        def tuned_unpooled():
+            conn = things3._connect(path)
+            conn.execute(query, params).fetchall()
+            conn.close()
+        
+        def tuned_pooled():
+            with pooled.connection() as conn:
+                conn.execute(query, params).fetchall()
+        
+        results = {}
+        for name, fn in (("legacy _connect()", legacy),
+                         ("read-only tuned, per call", tuned_unpooled),
+                         ("read-only tuned, pooled", tuned_pooled)):
+            fn()  # warm the OS page cache
+            results[name] = _time_calls(fn, args.calls)
+        _report(f"connect / {label}: {args.tasks} tasks, {args.calls} calls", results)
+    pooled.close()
+
+
+def bench_decode(args: argparse.Namespace) -> None:
+    """Generic _row_to_dict vs compiled per-column-set decoder on a logbook export."""
+    path = synthetic_db(args.tasks)
+    query = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate, stopDate
+        FROM TMTask WHERE trashed = 0 AND (status = 3 OR status = 2) AND type = 0
+    """
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    named_rows = conn.execute(query).fetchall()
+    conn.row_factory = None
+    cursor = conn.execute(query)
+    tuple_rows = cursor.fetchall()
+    conn.close()
+    
+    start = time.perf_counter()
+    legacy = [_legacy_row_to_dict(row) for row in named_rows]
+    legacy_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    decode = things3._cursor_decoder(cursor)
+    compiled = [decode(row) for row in tuple_rows]
+    compiled_time = time.perf_counter() - start
+    
+    assert [list(d.items()) for d in legacy] == [list(d.items()) for d in compiled]
+    print(f"\ndecode: {len(tuple_rows)} logbook rows")
+    _rate("legacy _row_to_dict", len(tuple_rows), legacy_time)
+    _rate("compiled decoder", len(tuple_rows), compiled_time, legacy_time)
+
+
+def bench_dates(args: argparse.Namespace) -> None:
+    """Uncached vs memoized date/timestamp decoding over every task."""
+    path = synthetic_db(args.tasks)
+    conn = sqlite3.connect(path)
+    cursor = conn.execute(
+        "SELECT uuid, startDate, deadline, creationDate, userModificationDate, stopDate FROM TMTask"
+    )
+    rows = cursor.fetchall()
+    columns = tuple(d[0] for d in cursor.description)
+    conn.close()
+    
+    # Compile a decoder around the pre-memoization converters
+    cached = (things3._things_date_to_str, things3._unix_to_str)
+    things3._things_date_to_str, things3._unix_to_str = _legacy_things_date_to_str, _legacy_unix_to_str
+    try:
+        legacy_decode = things3._compile_decoder(columns, True)
+    finally:
+        things3._things_date_to_str, things3._unix_to_str = cached
+    things3.clear_decode_caches()
+    decode = things3._compile_decoder(columns, True)
+    
+    start = time.perf_counter()
+    legacy = [legacy_decode(row) for row in rows]
+    legacy_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    memoized = [decode(row) for row in rows]
+    memoized_time = time.perf_counter() - start
+    
+    assert legacy == memoized
+    print(f"\ndates: {len(rows)} tasks, 5 date columns each")
+    _rate("uncached", len(rows), legacy_time)
+    _rate("memoized + fast path", len(rows), memoized_time, legacy_time)
+    for name, info in things3.decode_cache_info().items():
+        print(f"  {name:<12} {info}")
+
+
+def bench_search(args: argparse.Namespace) -> None:
+    """LIKE scan vs FTS5 sidecar index for search() at several database sizes."""
+    queries = (WORDS[0], WORDS[20], f"{WORDS[3]} {WORDS[50]}", f'"{WORDS[0]} {WORDS[1]}"', WORDS[-1])
+    os.environ.setdefault("THINGS3_CACHE_DIR", os.path.join(tempfile.gettempdir(), "things3-bench-cache"))
+    for tasks in args.scales:
+        things3.configure(synthetic_db(tasks))
+        index = things3.SearchIndex()
+        if os.path.exists(index.path):
+            os.remove(index.path)
+        start = time.perf_counter()
+        if not index.ensure_ready():
+            sys.exit("FTS5 is not available in this SQLite build")
+        build_time = time.perf_counter() - start
+        print(f"\nsearch: {tasks} tasks, index built in {build_time:.2f}s ({index.path})")
+        results = {}
+        for query in queries:
+            things3.search(query)  # warm up
+            results[f"LIKE  {query}"] = _time_calls(lambda: things3.search(query, fts=False), args.calls)
+            results[f"FTS5  {query}"] = _time_calls(lambda: things3.search(query), args.calls)
+        _report("", results)
+    things3.close()
+
+
+def bench_dashboard(args: argparse.Namespace) -> None:
+    """Six separate list calls vs one dashboard() scan."""
+    views = list(things3._DASHBOARD_VIEWS)
+    for tasks in args.scales:
+        things3.configure(synthetic_db(tasks))
+        separate = {view: getattr(things3, view)() for view in views}
+        assert things3.dashboard() == separate
+        results = {
+            "separate calls": _time_calls(lambda: [getattr(things3, view)() for view in views], args.calls),
+            "dashboard()": _time_calls(things3.dashboard, args.calls),
+        }
+        _report(f"dashboard: {tasks} tasks, {sum(map(len, separate.values()))} rows", results)
+    things3.close()
+
+
+def bench_tags(args: argparse.Namespace) -> None:
+    """Tag filters in SQL (EXISTS / NOT EXISTS) vs filtering include_tags rows in Python."""
+    for tasks in args.scales:
+        things3.configure(synthetic_db(tasks, tags=args.tag_count))
+        titles = [tag["title"] for tag in things3.tags()]  # most used first (see synth_db)
+        root = max(titles[:5], key=lambda title: len(things3.tag_descendants(title)))
+        filters = {
+            f"all  {titles[0]}": {"all_tags": [titles[0]]},
+            f"all  {titles[-1]}": {"all_tags": [titles[-1]]},
+            "any  top 10": {"any_tags": titles[:10]},
+            f"not  {titles[0]}": {"exclude_tags": [titles[0]]},
+            f"all  {root} +{len(things3.tag_descendants(root)) - 1} nested": {
+                "all_tags": [root], "expand_tags": True,
+            },
+        }
+        
+        def client_side(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+            expand = things3.tag_descendants if spec.get("expand_tags") else lambda title: [title]
+            required = [set(expand(title)) for title in spec.get("all_tags", ())]
+            wanted = set().union(*(expand(title) for title in spec.get("any_tags", ())))
+            excluded = set().union(*(expand(title) for title in spec.get("exclude_tags", ())))
+            return [
+                task for task in things3.anytime(include_tags=True)
+                if all(tags & set(task["tags"]) for tags in required)
+                and (not wanted or wanted & set(task["tags"]))
+                and not excluded & set(task["tags"])
+            ]
+        
+        results = {}
+        for name, spec in filters.items():
+            rows = things3.anytime(include_tags=True, **spec)
+            assert rows == client_side(spec), name
+            results[f"python {name} ({len(rows)})"] = _time_calls(lambda: client_side(spec), args.calls)
+            results[f"sql    {name} ({len(rows)})"] = _time_calls(
+                lambda: things3.anytime(include_tags=True, **spec), args.calls
+            )
+        _report(f"tags: anytime(), {tasks} tasks, {len(titles)} tags", results)
+    things3.close()
+
+
+def bench_cache(args: argparse.Namespace) -> None:
+    """Repeated reads with the result cache off, hit, and invalidated by a write."""
+    for tasks in args.scales:
+        path = synthetic_db(tasks)
+        context = _suite_context(path)
+        things3.configure(path)
+        calls = {
+            "today": things3.today,
+            "anytime tags": lambda: things3.anytime(include_tags=True),
+            "projects": things3.projects,
+            "search": lambda: things3.search(context["word"]),
+            "get": lambda: things3.get(context["task"]),
+            "counts": things3.counts,
+            "dashboard": things3.dashboard,
+        }
+        writer = sqlite3.connect(path)
+        
+        def write() -> None:
+            # What Things does on every edit: commit from another connection
+            writer.execute("UPDATE TMSettings SET uuid = uuid")
+            writer.commit()
+        
+        results = {}
+        for name, call in calls.items():
+            things3.configure_result_cache(max_entries=0)
+            results[f"off         {name}"] = _time_calls(call, args.calls)
+            things3.configure_result_cache()
+            call()
+            results[f"hit         {name}"] = _time_calls(call, args.calls)
+            
+            def invalidated() -> None:
+                write()
+                call()
+            
+            results[f"after write {name}"] = _time_calls(invalidated, args.calls)
+        writer.close()
+        _report(f"cache: {tasks} tasks (after write includes the write)", results)
+    things3.configure_result_cache(max_entries=0)
+    things3.close()
+
+
+def bench_snapshot(args: argparse.Namespace) -> None:
+    """Cold CLI processes reading main.sqlite vs a fresh snapshot (THINGS3_SNAPSHOT=1)."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "things3.py")
+    for tasks in args.scales:
+        path = synthetic_db(tasks)
+        conn = sqlite3.connect(path)
+        # An open task: others are not in the snapshot and fall back to main.sqlite
+        task = conn.execute(
+            "SELECT uuid FROM TMTask WHERE status = 0 AND trashed = 0 ORDER BY rowid DESC LIMIT 1"
+        ).fetchone()[0]
+        conn.close()
+        with tempfile.TemporaryDirectory() as cache:
+            env = dict(os.environ, THINGS3_DB=path, THINGS3_CACHE_DIR=cache, THINGS3_SOCKET="")
+            built = json.loads(subprocess.run(
+                [sys.executable, script, "snapshot"], env=env, capture_output=True, check=True
+            ).stdout)
+            
+            def cli(argv: List[str], **extra: str) -> Callable[[], object]:
+                run_env = dict(env, **extra)
+                return lambda: subprocess.run(
+                    [sys.executable, script, *argv], env=run_env, stdout=subprocess.DEVNULL, check=True
+                )
+            
+            results = {}
+            for argv in (["today"], ["inbox"], ["anytime"], ["get", task]):
+                name = " ".join(argv[:1])
+                results[f"sqlite   {name}"] = _time_calls(cli(argv), args.calls)
+                results[f"snapshot {name}"] = _time_calls(cli(argv, THINGS3_SNAPSHOT="1"), args.calls)
+            results["python startup only"] = _time_calls(
+                lambda: subprocess.run([sys.executable, "-c", "pass"], check=True), args.calls
+            )
+            _report(
+                f"snapshot: {tasks} tasks, one process per call "
+                f"(build {built['ms']:.0f} ms, {built['bytes'] / 1e6:.1f} MB)",
+                results,
+            )
+
+
+def bench_watch(args: argparse.Namespace) -> None:
+    """ChangeFeed.changes() after N modified tasks vs re-reading the lists to spot changes."""
+    for tasks in args.scales:
+        with tempfile.TemporaryDirectory() as scratch:
+            # Written to, so work on a copy of the shared synthetic database
+            path = shutil.copy(synthetic_db(tasks), os.path.join(scratch, "main.sqlite"))
+            things3.configure(path)
+            writer = sqlite3.connect(path)
+            uuids = [row[0] for row in writer.execute(
+                "SELECT uuid FROM TMTask WHERE trashed = 0 ORDER BY random() LIMIT ?", (max(args.changes),)
+            )]
+            feed = things3.ChangeFeed()
+            feed.changes()
+            stamp = writer.execute("SELECT max(userModificationDate) FROM TMTask").fetchone()[0]
+            
+            def modify(count: int) -> None:
+                nonlocal stamp
+                stamp += 1
+                writer.executemany(
+                    "UPDATE TMTask SET title = title || '.', userModificationDate = ? WHERE uuid = ?",
+                    [(stamp, uuid) for uuid in uuids[:count]],
+                )
+                writer.commit()
+            
+            results = {}
+            for count in args.changes:
+                timings = []
+                for _ in range(args.calls):
+                    modify(count)
+                    start = time.perf_counter()
+                    events = feed.changes()
+                    timings.append(time.perf_counter() - start)
+                    assert len(events) == count, (len(events), count)
+                results[f"changes() {count} modified"] = timings
+            results["changes() nothing modified"] = _time_calls(feed.changes, args.calls)
+            results["dashboard() (re-read lists)"] = _time_calls(things3.dashboard, args.calls)
+            writer.close()
+            things3.close()
+            _report(f"watch: {tasks} tasks", results)
+
+
+def bench_diff(args: argparse.Namespace) -> None:
+    """export_fingerprints() and diff_fingerprints() vs diffing two full SELECT * reads in memory."""
+    for tasks in args.scales:
+        with tempfile.TemporaryDirectory() as scratch:
+            # Written to, so work on a copy of the shared synthetic database
+            path = shutil.copy(synthetic_db(tasks), os.path.join(scratch, "main.sqlite"))
+            things3.configure(path)
+            old, new = os.path.join(scratch, "old.t3x"), os.path.join(scratch, "new.t3x")
+            
+            def full_read() -> Dict[str, tuple]:
+                conn = sqlite3.connect(path)
+                rows = {row[0]: row for row in conn.execute("SELECT uuid, * FROM TMTask")}
+                conn.close()
+                return rows
+            
+            before = full_read()
+            things3.export_fingerprints(old)
+            writer = sqlite3.connect(path)
+            writer.execute(
+                "UPDATE TMTask SET title = title || '.' WHERE rowid IN "
+                "(SELECT rowid FROM TMTask ORDER BY random() LIMIT ?)", (args.changes,)
+            )
+            writer.commit()
+            writer.close()
+            
+            results = {}
+            results["export_fingerprints()"] = _time_calls(lambda: things3.export_fingerprints(new), args.calls)
+            
+            def diff() -> None:
+                changes = list(things3.diff_fingerprints(old, new))
+                assert len(changes) == args.changes, (len(changes), args.changes)
+            
+            def diff_in_memory() -> None:
+                after = full_read()
+                changes = [uuid for uuid, row in after.items() if before.get(uuid) != row]
+                assert len(changes) == args.changes, (len(changes), args.changes)
+            
+            results["diff_fingerprints()"] = _time_calls(diff, args.calls)
+            results["in memory (re-read + dicts)"] = _time_calls(diff_in_memory, args.calls)
+            peaks = {}
+            for name, fn in (("diff", diff), ("in memory", diff_in_memory)):
+                tracemalloc.start()
+                fn()
+                peaks[name] = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+            things3.close()
+            _report(
+                f"diff: {tasks} tasks, {args.changes} modified (export {os.path.getsize(old) / 1e6:.1f} MB; "
+                f"peak {peaks['diff']:.0f} MB diff vs {peaks['in memory']:.0f} MB in memory, "
+                f"not counting the old rows held for it)",
+                results,
+            )
+
+
+def bench_daemon(args: argparse.Namespace) -> None:
+    """One-shot CLI processes with and without the query daemon (things3.py serve)."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "things3.py")
+    for tasks in args.scales:
+        path = synthetic_db(tasks)
+        context = _suite_context(path)
+        commands = [["today"], ["anytime", "--tags"], ["get", context["task"]], ["search", context["word"]], ["counts"]]
+        with tempfile.TemporaryDirectory() as cache:
+            env = dict(os.environ, THINGS3_DB=path, THINGS3_CACHE_DIR=cache)
+            env.pop("THINGS3_SOCKET", None)
+            socket_path = os.path.join(cache, "daemon.sock")
+            server = subprocess.Popen([sys.executable, script, "serve"], env=env, stderr=subprocess.DEVNULL)
+            try:
+                deadline = time.time() + 120
+                while things3._daemon_request(socket_path, {"op": "stats"}) is None:
+                    if server.poll() is not None or time.time() > deadline:
+                        sys.exit("daemon did not start")
+                    time.sleep(0.05)
+                
+                def cli(argv: List[str], **extra: str) -> Callable[[], object]:
+                    run_env = dict(env, **extra)
+                    return lambda: subprocess.run(
+                        [sys.executable, script, *argv], env=run_env, stdout=subprocess.DEVNULL, check=True
+                    )
+                
+                results = {}
+                for argv in commands:
+                    name = " ".join(argv)
+                    request = {"argv": argv, "stdin": None, "db": path}
+                    results[f"process {name}"] = _time_calls(cli(argv, THINGS3_SOCKET=""), args.calls)
+                    results[f"client  {name}"] = _time_calls(cli(argv), args.calls)
+                    results[f"socket  {name}"] = _time_calls(
+                        lambda: things3._daemon_request(socket_path, request), args.calls
+                    )
+                _report(
+                    f"daemon: {tasks} tasks (process: no daemon, client: CLI via daemon, "
+                    "socket: request from a running process)",
+                    results,
+                )
+            finally:
+                server.terminate()
+                server.wait()
+
+
+# ============== SUITE ==============
+
+# Every public read function: (name, call, query) where call runs the public
+# function and query returns the (sql, params, convert) it runs, for the
+# per-stage breakdown. Both take the sample ids picked by _suite_context().
+SUITE: List[Tuple[str, Callable[[Dict[str, Any]], Any], Callable[[Dict[str, Any]], Tuple[str, Tuple, bool]]]] = [
+    ("today", lambda c: things3.today(), lambda c: (*things3._today_query(), True)),
+    ("inbox", lambda c: things3.inbox(), lambda c: (*things3._inbox_query(), True)),
+    ("upcoming", lambda c: things3.upcoming(), lambda c: (*things3._upcoming_query(), True)),
+    ("anytime", lambda c: things3.anytime(), lambda c: (*things3._anytime_query(), True)),
+    ("someday", lambda c: things3.someday(), lambda c: (*things3._someday_query(), True)),
+    ("projects", lambda c: things3.projects(), lambda c: (*things3._projects_query(), True)),
+    ("areas", lambda c: things3.areas(), lambda c: (*things3._areas_query(), False)),
+    ("tags", lambda c: things3.tags(), lambda c: (*things3._tags_query(), False)),
+    ("completed", lambda c: things3.completed(30), lambda c: (*things3._completed_query(30), True)),
+    ("logbook", lambda c: things3.logbook(), lambda c: (*things3._logbook_query(), True)),
+    ("search", lambda c: things3.search(c["word"]),
+     lambda c: (*things3._search_query(c["word"], things3._search_fts_query(c["word"], True)), True)),
+    ("get", lambda c: things3.get(c["task"]), lambda c: (*things3._get_query(c["task"]), True)),
+    ("get_many", lambda c: things3.get_many(c["tasks"]), lambda c: (*things3._get_many_query(c["tasks"]), True)),
+    ("deadlines", lambda c: things3.deadlines(), lambda c: (*things3._deadlines_query(), True)),
+    ("project_todos", lambda c: things3.project_todos(c["project"]),
+     lambda c: (*things3._project_todos_query(c["project"]), True)),
+    ("area_items", lambda c: things3.area_items(c["area"]),
+     lambda c: (*things3._area_items_query(c["area"]), True)),
+]
+
+# A function regresses when its p50 grows by more than --threshold and by
+# more than this many ms (sub-0.05 ms differences are timer noise)
+REGRESSION_FLOOR_MS = 0.05
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))]
+
+
+def _serialize(result: Any) -> str:
+    """What the CLI writes for a result (default --format json)."""
+    out = io.StringIO()
+    things3._write_json(result, out)
+    return out.getvalue()
+
+
+def _suite_context(path: str) -> Dict[str, Any]:
+    """Representative arguments: the largest project and area, a mid-table task,
+    500 tasks spread over the table."""
+    conn = sqlite3.connect(path)
+    try:
+        largest = "SELECT {0} FROM TMTask WHERE {0} IS NOT NULL GROUP BY {0} ORDER BY count(*) DESC LIMIT 1"
+        return {
+            "project": conn.execute(largest.format("project")).fetchone()[0],
+            "area": conn.execute(largest.format("area")).fetchone()[0],
+            "task": conn.execute(
+                "SELECT uuid FROM TMTask LIMIT 1 OFFSET (SELECT count(*) / 2 FROM TMTask)"
+            ).fetchone()[0],
+            "tasks": [row[0] for row in conn.execute(
+                "SELECT uuid FROM TMTask WHERE rowid % max(1, (SELECT count(*) / 500 FROM TMTask)) = 0 LIMIT 500"
+            )],
+            "word": WORDS[10],
+        }
+    finally:
+        conn.close()
+
+
+def _measure(
+    path: str, context: Dict[str, Any], call: Callable, query: Callable, calls: int
+) -> Dict[str, Any]:
+    """Latency, throughput, peak memory and stage breakdown of one read function."""
+    _serialize(call(context))  # warm up: page cache, decoders, search index
+    
+    totals = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        result = call(context)
+        _serialize(result)
+        totals.append(time.perf_counter() - start)
+    rows = things3._result_rows(result)
+    
+    tracemalloc.start()
+    _serialize(call(context))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    
+    # Stage breakdown on a fresh connection, as a one-shot CLI call pays it
+    stages: Dict[str, List[float]] = {"connect": [], "execute": [], "decode": [], "serialize": []}
+    for _ in range(calls):
+        sql, params, convert = query(context)
+        t0 = time.perf_counter()
+        conn = things3._connect(path)
+        t1 = time.perf_counter()
+        if "search_index." in sql:
+            conn.execute("ATTACH DATABASE ? AS search_index", (things3._search_index.path,))
+            t1 = time.perf_counter()
+        cursor = conn.execute(sql, params)
+        raw = cursor.fetchall()
+        t2 = time.perf_counter()
+        decode = things3._cursor_decoder(cursor, convert)
+        decoded = [decode(row) for row in raw]
+        t3 = time.perf_counter()
+        _serialize(decoded)
+        t4 = time.perf_counter()
+        conn.close()
+        for stage, seconds in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            stages[stage].append(seconds)
+    
+    ordered = sorted(totals)
+    p50 = _percentile(ordered, 50)
+    return {
+        "rows": rows,
+        "mean_ms": statistics.mean(totals) * 1e3,
+        "p50_ms": p50 * 1e3,
+        "p95_ms": _percentile(ordered, 95) * 1e3,
+        "p99_ms": _percentile(ordered, 99) * 1e3,
+        "rows_per_s": rows / p50 if p50 else 0.0,
+        "peak_kib": peak / 1024,
+        "breakdown_ms": {stage: statistics.median(t) * 1e3 for stage, t in stages.items()},
+    }
+
+
+def _compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Functions whose p50 regressed against a saved run, as report lines."""
+    regressions = []
+    for scale, functions in results["results"].items():
+        for name, current in functions.items():
+            before = baseline.get("results", {}).get(scale, {}).get(name)
+            if not before:
+                continue
+            ratio = current["p50_ms"] / before["p50_ms"] if before["p50_ms"] else 1.0
+            if ratio > 1 + threshold and current["p50_ms"] - before["p50_ms"] > REGRESSION_FLOOR_MS:
+                regressions.append(
+                    f"{scale:>8} {name:<14} p50 {before['p50_ms']:.3f} -> {current['p50_ms']:.3f} ms (x{ratio:.2f})"
+                )
+    return regressions
+
+
+def bench_suite(args: argparse.Namespace) -> Optional[int]:
+    """Every public read function at several database sizes, optionally vs a baseline."""
+    os.environ.setdefault("THINGS3_CACHE_DIR", os.path.join(tempfile.gettempdir(), "things3-bench-cache"))
+    results: Dict[str, Any] = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "calls": args.calls,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    for tasks in args.scales:
+        path = synthetic_db(tasks, args.seed)
+        things3.configure(path)
+        context = _suite_context(path)
+        print(f"\nsuite: {tasks} tasks, {args.calls} calls")
+        print(f"{'function':<14} {'rows':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rows/s':>11} "
+              f"{'peak KiB':>9}   connect/execute/decode/serialize ms")
+        scale_results = results["results"][str(tasks)] = {}
+        for name, call, query in SUITE:
+            if args.only and name not in args.only:
+                continue
+            r = scale_results[name] = _measure(path, context, call, query, args.calls)
+            stages = "/".join(f"{ms:.2f}" for ms in r["breakdown_ms"].values())
+            print(f"{name:<14} {r['rows']:>7} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} "
+                  f"{r['rows_per_s']:>11,.0f} {r['peak_kib']:>9.0f}   {stages}")
+    things3.close()
+    
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nsaved to {args.save}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = _compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            print("\n".join(regressions))
+            return 1
+        print(f"\nno regressions against {args.baseline}")
+    return None
+
+
+def main() -> Optional[int]:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+    
+    p = sub.add_parser("connect", help="connection setup cost per read")
+    p.add_argument("--tasks", type=int, default=200_000)
+    p.add_argument("--calls", type=int, default=200)
+    p.set_defaults(func=bench_connect)
+    
+    p = sub.add_parser("decode", help="row decoding throughput")
+    p.add_argument("--tasks", type=int, default=100_000)
+    p.set_defaults(func=bench_decode)
+    
+    p = sub.add_parser("dates", help="date and timestamp decoding throughput")
+    p.add_argument("--tasks", type=int, default=100_000)
+    p.set_defaults(func=bench_dates)
+    
+    p = sub.add_parser("search", help="LIKE scan vs FTS5 search index")
+    p.add_argument("--scales", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--calls", type=int, default=10)
+    p.set_defaults(func=bench_search)
+    
+    p = sub.add_parser("dashboard", help="separate list calls vs one dashboard() scan")
+    p.add_argument("--scales", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[1_000, 10_000, 100_000])
+    p.add_argument("--calls", type=int, default=10)
+    p.set_defaults(func=bench_dashboard)
+    
+    p = sub.add_parser("tags", help="tag filters in SQL vs filtering in Python")
+    p.add_argument("--scales", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[10_000, 100_000])
+    p.add_argument("--tag-count", type=int, default=2_000, help="tags in the synthetic database")
+    p.add_argument("--calls", type=int, default=10)
+    p.set_defaults(func=bench_tags)
+    
+    p = sub.add_parser("cache", help="repeated reads with and without the result cache")
+    p.add_argument("--scales", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[10_000, 100_000])
+    p.add_argument("--calls", type=int, default=10)
+    p.set_defaults(func=bench_cache)
+    
+    p = sub.add_parser("watch", help="change feed diffs vs re-reading the lists")
+    p.add_argument("--scales", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[10_000, 100_000])
+    p.add_argument("--changes", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[1, 10, 100, 1_000], help="tasks modified per diff")
+    p.add_argument("--calls", type=int, default=10)
+    p.set_defaults(func=bench_watch)
+    
+    p = sub.add_parser("diff", help="export + diff of two points in time vs an in-memory diff")
+    p.add_argument("--scales", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[10_000, 100_000])
+    p.add_argument("--changes", type=int, default=100, help="tasks modified between the exports")
+    p.add_argument("--calls", type=int, default=3)
+    p.set_defaults(func=bench_diff)
+    
+    p = sub.add_parser("daemon", help="CLI calls with and without the query daemon")
+    p.add_argument("--scales", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[10_000, 100_000])
+    p.add_argument("--calls", type=int, default=10)
+    p.set_defaults(func=bench_daemon)
+    
+    p = sub.add_parser("snapshot", help="cold CLI calls with and without the snapshot file")
+    p.add_argument("--scales", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[10_000, 100_000])
+    p.add_argument("--calls", type=int, default=10)
+    p.set_defaults(func=bench_snapshot)
+    
+    p = sub.add_parser("suite", help="every public read function, saved as JSON")
+    p.add_argument("--scales", type=lambda v: [int(n) for n in v.split(",")],
+                   default=[1_000, 10_000, 100_000])
+    p.add_argument("--calls", type=int, default=20)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--only", type=lambda v: v.split(","), default=None,
+                   help="comma-separated function names")
+    p.add_argument("--save", metavar="FILE", help="write results as JSON")
+    p.add_argument("--baseline", metavar="FILE", help="flag p50 regressions against a saved run")
+    p.add_argument("--threshold", type=float, default=0.2,
+                   help="allowed p50 slowdown before flagging (default 0.2 = 20%%)")
+    p.set_defaults(func=bench_suite)
+    
+    args = parser.parse_args()
+    # Measure reads, not result cache hits (bench_cache turns it on itself)
+    things3.configure_result_cache(max_entries=0)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
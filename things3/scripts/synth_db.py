@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Synthetic Things 3 database generator - No external dependencies required.
+Writes a main.sqlite with the tables and columns things3.py reads, filled with
+realistic data, so the read path can be exercised off macOS and at scale.
+
+Output is reproducible: the same seed, scale and --today give the same data.
+
+Usage:
+    python synth_db.py OUTPUT [--seed N] [--todos N] [--today YYYY-MM-DD] [scale options]
+    THINGS3_DB=OUTPUT python things3.py today
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# ============== SCHEMA ==============
+
+# Subset of the Things 3 schema: every table things3.py reads, with the
+# columns of the real database in their original order
+SCHEMA = """
+    CREATE TABLE TMTask (
+        uuid TEXT PRIMARY KEY, leavesTombstone INTEGER, creationDate REAL,
+        userModificationDate REAL, type INTEGER, status INTEGER, stopDate REAL,
+        trashed INTEGER, title TEXT, notes TEXT, notesSync INTEGER, cachedTags BLOB,
+        start INTEGER, startDate INTEGER, startBucket INTEGER, reminderTime INTEGER,
+        lastReminderInteractionDate REAL, deadline INTEGER, deadlineSuppressionDate INTEGER,
+        t2_deadlineOffset INTEGER, "index" INTEGER, todayIndex INTEGER,
+        todayIndexReferenceDate INTEGER, area TEXT, project TEXT, heading TEXT,
+        contact TEXT, untrashedLeafActionsCount INTEGER, openUntrashedLeafActionsCount INTEGER,
+        checklistItemsCount INTEGER, openChecklistItemsCount INTEGER,
+        rt1_repeatingTemplate TEXT, rt1_recurrenceRule BLOB,
+        rt1_instanceCreationStartDate INTEGER, rt1_instanceCreationPaused INTEGER,
+        rt1_instanceCreationCount INTEGER, rt1_afterCompletionReferenceDate INTEGER,
+        rt1_nextInstanceStartDate INTEGER, experimental BLOB, repeater BLOB,
+        repeaterMigrationDate REAL
+    );
+    CREATE TABLE TMArea (
+        uuid TEXT PRIMARY KEY, title TEXT, visible INTEGER, "index" INTEGER,
+        cachedTags BLOB, experimental BLOB
+    );
+    CREATE TABLE TMTag (
+        uuid TEXT PRIMARY KEY, title TEXT, shortcut TEXT, usedDate REAL, parent TEXT,
+        "index" INTEGER, experimental BLOB
+    );
+    CREATE TABLE TMTaskTag (tasks TEXT NOT NULL, tags TEXT NOT NULL);
+    CREATE TABLE TMAreaTag (areas TEXT NOT NULL, tags TEXT NOT NULL);
+    CREATE TABLE TMChecklistItem (
+        uuid TEXT PRIMARY KEY, userModificationDate REAL, creationDate REAL, title TEXT,
+        status INTEGER, stopDate REAL, "index" INTEGER, task TEXT,
+        leavesTombstone INTEGER, experimental BLOB
+    );
+    CREATE TABLE TMSettings (
+        uuid TEXT PRIMARY KEY, logInterval INTEGER, manualLogDate REAL,
+        groupTodayByParent INTEGER, uriSchemeAuthenticationToken TEXT, experimental BLOB
+    );
+    CREATE INDEX index_TMTask_stopDate ON TMTask (stopDate);
+    CREATE INDEX index_TMTask_project ON TMTask (project);
+    CREATE INDEX index_TMTask_area ON TMTask (area);
+    CREATE INDEX index_TMTask_heading ON TMTask (heading);
+    CREATE INDEX index_TMTask_repeatingTemplate ON TMTask (rt1_repeatingTemplate);
+    CREATE INDEX index_TMTaskTag_tasks ON TMTaskTag (tasks);
+    CREATE INDEX index_TMAreaTag_areas ON TMAreaTag (areas);
+    CREATE INDEX index_TMChecklistItem_task ON TMChecklistItem (task);
+"""
+
+TASK_COLUMNS = (
+    "uuid", "creationDate", "userModificationDate", "type", "status", "stopDate",
+    "trashed", "title", "notes", "start", "startDate", "deadline",
+    "deadlineSuppressionDate", "index", "todayIndex", "area", "project", "heading",
+    "rt1_repeatingTemplate", "rt1_recurrenceRule", "rt1_nextInstanceStartDate",
+)
+
+
+# ============== SCALE ==============
+
+# Scale factors for the default --todos; the others follow --todos in proportion
+DEFAULT_TODOS = 2000
+DEFAULT_SCALE = {
+    "areas": 8,
+    "projects": 40,
+    "headings": 60,
+    "todos": DEFAULT_TODOS,
+    "tags": 25,
+    "checklist_items": 1500,
+    "logbook": 1200,
+    "logbook_days": 730,
+    "recurring": 20,
+}
+
+
+def scale_for(todos: int, **overrides: Optional[int]) -> Dict[str, int]:
+    """Scale factors for a database with N open+logged todos.
+    
+    Counts grow linearly with todos, except areas and tags, which grow with
+    the square root (people do not keep 100x more areas for 100x more tasks).
+    Explicit overrides (None values are ignored) win.
+    """
+    ratio = todos / DEFAULT_TODOS
+    scale = {
+        key: max(1, round(value * (ratio ** 0.5 if key in ("areas", "tags") else ratio)))
+        for key, value in DEFAULT_SCALE.items()
+    }
+    scale["todos"] = todos
+    scale["logbook_days"] = DEFAULT_SCALE["logbook_days"]
+    scale.update({k: v for k, v in overrides.items() if v is not None})
+    return scale
+
+
+# ============== VALUES ==============
+
+# Pseudo-words for titles and notes, drawn with a Zipf distribution so text
+# search sees realistic selectivity (a few common words, a long tail of rare ones)
+WORDS = [a + b + c for a in ("ba", "ko", "mi", "su", "te", "ra", "lo", "ne", "vi", "da")
+         for b in ("ren", "lak", "mot", "sil", "pur", "gan", "dex", "fol", "wim", "tah")
+         for c in ("a", "o", "in", "er", "us", "ix", "el", "an", "um", "or")]
+WORD_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(WORDS) + 1)))
+
+# Things uuids are 22 characters from this alphabet
+UUID_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+# Stand-in for the serialized recurrence rule (the real one is a binary plist)
+RECURRENCE_RULE = b"bplist00\xd4\x01\x02\x03\x04\x05\x06\x07\x08rrv1fuof"
+
+
+def _words(rng: random.Random, k: int) -> str:
+    return " ".join(rng.choices(WORDS, cum_weights=WORD_WEIGHTS, k=k))
+
+
+def _title(rng: random.Random) -> str:
+    return _words(rng, rng.randint(2, 6)).capitalize()
+
+
+def _notes(rng: random.Random, share: float) -> Optional[str]:
+    if rng.random() >= share:
+        return None
+    return _words(rng, min(400, int(rng.expovariate(1 / 25)) + 1))
+
+
+def _uuid(rng: random.Random) -> str:
+    return "".join(rng.choices(UUID_ALPHABET, k=22))
+
+
+def _things_date(d: date) -> int:
+    """Encode a date the way Things stores startDate/deadline."""
+    return (d.year << 16) | (d.month << 12) | (d.day << 7)
+
+
+class _Clock:
+    """Dates and timestamps relative to a fixed 'today', so output is reproducible."""
+    
+    def __init__(self, rng: random.Random, today: date):
+        self.rng = rng
+        self.today = today
+        self.now = datetime(today.year, today.month, today.day, 12, tzinfo=timezone.utc).timestamp()
+    
+    def day(self, offset: int) -> int:
+        return _things_date(self.today + timedelta(days=offset))
+    
+    def past(self, max_days: float, recent_bias: float = 1.0) -> float:
+        """Timestamp up to max_days ago; recent_bias > 1 favours recent times."""
+        return self.now - max_days * 86400 * self.rng.random() ** recent_bias
+    
+    def after(self, timestamp: float) -> float:
+        """Timestamp between `timestamp` and now."""
+        return timestamp + (self.now - timestamp) * self.rng.random()
+
+
+# ============== GENERATOR ==============
+
+def _task(**values: Any) -> Tuple:
+    return tuple(values.get(column) for column in TASK_COLUMNS)
+
+
+def _open_schedule(rng: random.Random, clock: _Clock, inbox_share: float = 0.0) -> Dict[str, Any]:
+    """start/startDate/deadline/todayIndex of an open to-do.
+    
+    Roughly: 10% Today (scheduled for today or overdue), 15% Upcoming
+    (Someday with a future startDate), 15% Someday, the rest Anytime;
+    12% carry a deadline, a fifth of those overdue.
+    """
+    values: Dict[str, Any] = {"start": 1}
+    roll = rng.random()
+    if roll < inbox_share:
+        values["start"] = 0
+    elif roll < inbox_share + 0.10:
+        values["startDate"] = clock.day(-int(rng.expovariate(1 / 3)))
+        values["todayIndex"] = rng.randint(-500, 500)
+    elif roll < inbox_share + 0.25:
+        values["start"] = 2
+        values["startDate"] = clock.day(1 + int(rng.expovariate(1 / 20)))
+    elif roll < inbox_share + 0.40:
+        values["start"] = 2
+    if rng.random() < 0.12:
+        values["deadline"] = clock.day(
+            -rng.randint(1, 30) if rng.random() < 0.2 else rng.randint(0, 90)
+        )
+        if rng.random() < 0.05:
+            values["deadlineSuppressionDate"] = clock.day(0)
+    return values
+
+
+def generate(path: str, seed: int = 0, today: Optional[date] = None, **scale: int) -> Dict[str, int]:
+    """Write a synthetic Things database to `path` (replaced if it exists).
+    
+    Args:
+        path: Output file
+        seed: Random seed; same seed, scale and today give the same data
+        today: Date the data is relative to (default: today)
+        **scale: Scale factors (see DEFAULT_SCALE, scale_for)
+    
+    Returns:
+        Row counts per table
+    """
+    scale = {**scale_for(scale.get("todos", DEFAULT_TODOS)), **scale}
+    rng = random.Random(seed)
+    clock = _Clock(rng, today or date.today())
+    
+    tmp = path + ".tmp"
+    for stale in (tmp, tmp + "-wal", tmp + "-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    conn = sqlite3.connect(tmp)
+    conn.executescript(SCHEMA)
+    conn.execute(
+        "INSERT INTO TMSettings VALUES (?, 0, NULL, 0, ?, NULL)",
+        ("RhAzEf6qDxCD5PmnZVtBZR", _uuid(rng)),
+    )
+    
+    # Areas and tags (a third of tags nested under a top-level one)
+    areas = [_uuid(rng) for _ in range(scale["areas"])]
+    conn.executemany(
+        'INSERT INTO TMArea (uuid, title, visible, "index") VALUES (?, ?, ?, ?)',
+        [(uuid, _title(rng), int(rng.random() > 0.1), i) for i, uuid in enumerate(areas)],
+    )
+    tags: List[str] = []
+    tag_rows = []
+    for i in range(scale["tags"]):
+        uuid = _uuid(rng)
+        parent = rng.choice(tags[:5]) if tags and rng.random() < 0.33 else None
+        shortcut = chr(ord("a") + i) if i < 26 and rng.random() < 0.3 else None
+        tag_rows.append((uuid, f"{rng.choice(WORDS)}-{i}", shortcut, clock.past(90), parent, i))
+        tags.append(uuid)
+    conn.executemany(
+        'INSERT INTO TMTag (uuid, title, shortcut, usedDate, parent, "index") VALUES (?, ?, ?, ?, ?, ?)',
+        tag_rows,
+    )
+    
+    # Tag usage is skewed: a few tags are on most tagged tasks
+    tag_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(tags) + 1)))
+    task_tags: List[Tuple[str, str]] = []
+    
+    def tag(uuid: str, share: float) -> None:
+        if tags and rng.random() < share:
+            for tag_uuid in dict.fromkeys(rng.choices(tags, cum_weights=tag_weights, k=rng.randint(1, 3))):
+                task_tags.append((uuid, tag_uuid))
+    
+    # Projects (85% in an area; 10% already logged), then their headings
+    projects = []
+    project_rows = []
+    for i in range(scale["projects"]):
+        uuid = _uuid(rng)
+        created = clock.past(900, 0.7)
+        logged = rng.random() < 0.1
+        status = (3 if rng.random() < 0.8 else 2) if logged else 0
+        schedule = {} if logged else _open_schedule(rng, clock)
+        project_rows.append(_task(
+            uuid=uuid, creationDate=created, userModificationDate=clock.after(created),
+            type=1, status=status, stopDate=clock.after(created) if logged else None,
+            trashed=int(rng.random() < 0.01), title=_title(rng), notes=_notes(rng, 0.3),
+            start=schedule.get("start", 1), startDate=schedule.get("startDate"),
+            deadline=schedule.get("deadline"), index=i,
+            area=rng.choice(areas) if areas and rng.random() < 0.85 else None,
+        ))
+        tag(uuid, 0.2)
+        if not logged:
+            projects.append(uuid)
+    headings = []
+    for i in range(scale["headings"] if projects else 0):
+        uuid = _uuid(rng)
+        project = rng.choice(projects)
+        created = clock.past(600)
+        project_rows.append(_task(
+            uuid=uuid, creationDate=created, userModificationDate=clock.after(created),
+            type=2, status=0, trashed=0, title=_title(rng), start=1, index=i, project=project,
+        ))
+        headings.append(uuid)
+    conn.executemany(f"INSERT INTO TMTask ({_column_list()}) VALUES ({_marks()})", project_rows)
+    
+    def container(loose_share: float) -> Dict[str, Any]:
+        """Where a to-do lives: a project, a heading in a project, an area, or nowhere."""
+        roll = rng.random()
+        if roll < 0.55 and projects:
+            return {"project": rng.choice(projects)}
+        if roll < 0.70 and headings:
+            return {"heading": rng.choice(headings)}
+        if roll < 1 - loose_share and areas:
+            return {"area": rng.choice(areas)}
+        return {}
+    
+    # Repeating templates; each has one open instance scheduled on or before today
+    todo_uuids: List[str] = []
+    
+    def templates() -> Iterator[Tuple]:
+        for i in range(scale["recurring"]):
+            uuid, instance = _uuid(rng), _uuid(rng)
+            created = clock.past(400)
+            where = container(0.2)
+            yield _task(
+                uuid=uuid, creationDate=created, userModificationDate=clock.after(created),
+                type=0, status=0, trashed=0, title=_title(rng), start=2, index=i,
+                rt1_recurrenceRule=RECURRENCE_RULE,
+                rt1_nextInstanceStartDate=clock.day(rng.randint(1, 30)), **where,
+            )
+            yield _task(
+                uuid=instance, creationDate=clock.past(7), userModificationDate=clock.past(7),
+                type=0, status=0, trashed=0, title=_title(rng), start=1,
+                startDate=clock.day(-rng.randint(0, 6)), todayIndex=rng.randint(-500, 500),
+                index=i, rt1_repeatingTemplate=uuid, **where,
+            )
+            todo_uuids.append(instance)
+    
+    # Open to-dos (about 10% in the Inbox, 1% trashed)
+    def open_todos() -> Iterator[Tuple]:
+        for i in range(max(0, scale["todos"] - scale["logbook"])):
+            uuid = _uuid(rng)
+            created = clock.past(500, 1.5)
+            schedule = _open_schedule(rng, clock, inbox_share=0.10)
+            where = {} if schedule["start"] == 0 else container(0.15)
+            yield _task(
+                uuid=uuid, creationDate=created, userModificationDate=clock.after(created),
+                type=0, status=0, trashed=int(rng.random() < 0.01), title=_title(rng),
+                notes=_notes(rng, 0.4), index=rng.randint(-100_000, 100_000),
+                **schedule, **where,
+            )
+            tag(uuid, 0.35)
+            todo_uuids.append(uuid)
+    
+    # Logbook: completed (85%) or canceled to-dos, stopDate skewed to recent days
+    def logged_todos() -> Iterator[Tuple]:
+        for i in range(min(scale["logbook"], scale["todos"])):
+            uuid = _uuid(rng)
+            stopped = clock.past(scale["logbook_days"], 2.0)
+            created = stopped - rng.expovariate(1 / (14 * 86400))
+            yield _task(
+                uuid=uuid, creationDate=created, userModificationDate=stopped,
+                type=0, status=3 if rng.random() < 0.85 else 2, stopDate=stopped,
+                trashed=int(rng.random() < 0.01), title=_title(rng), notes=_notes(rng, 0.3),
+                start=1, index=rng.randint(-100_000, 100_000), **container(0.2),
+            )
+            tag(uuid, 0.3)
+            todo_uuids.append(uuid)
+    
+    insert = f"INSERT INTO TMTask ({_column_list()}) VALUES ({_marks()})"
+    conn.executemany(insert, templates())
+    conn.executemany(insert, open_todos())
+    conn.executemany(insert, logged_todos())
+    conn.executemany("INSERT INTO TMTaskTag VALUES (?, ?)", task_tags)
+    
+    # Checklist items cluster on a minority of to-dos (3-10 items each)
+    def checklist_items() -> Iterator[Tuple]:
+        remaining = scale["checklist_items"] if todo_uuids else 0
+        while remaining > 0:
+            task = rng.choice(todo_uuids)
+            for index in range(min(remaining, rng.randint(3, 10))):
+                created = clock.past(200)
+                done = rng.random() < 0.4
+                yield (
+                    _uuid(rng), clock.after(created), created, _title(rng),
+                    3 if done else 0, clock.after(created) if done else None, index, task, 0,
+                )
+                remaining -= 1
+    
+    conn.executemany(
+        'INSERT INTO TMChecklistItem (uuid, userModificationDate, creationDate, title, status, '
+        'stopDate, "index", task, leavesTombstone) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        checklist_items(),
+    )
+    conn.commit()
+    counts = {
+        table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        for table in ("TMTask", "TMArea", "TMTag", "TMTaskTag", "TMChecklistItem")
+    }
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+    os.replace(tmp, path)
+    for stale in (path + "-wal", path + "-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    return counts
+
+
+def _column_list() -> str:
+    return ", ".join(f'"{column}"' for column in TASK_COLUMNS)
+
+
+def _marks() -> str:
+    return ", ".join("?" * len(TASK_COLUMNS))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", help="path of the database to write")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", type=date.fromisoformat, default=None,
+                        help="date the data is relative to (default: today)")
+    parser.add_argument("--todos", type=int, default=DEFAULT_TODOS,
+                        help="open + logged to-dos; other counts scale with it")
+    for key in DEFAULT_SCALE:
+        if key != "todos":
+            parser.add_argument("--" + key.replace("_", "-"), type=int, default=None)
+    args = parser.parse_args(argv)
+    
+    scale = scale_for(args.todos, **{key: getattr(args, key) for key in DEFAULT_SCALE if key != "todos"})
+    start = time.perf_counter()
+    counts = generate(args.output, seed=args.seed, today=args.today, **scale)
+    elapsed = time.perf_counter() - start
+    print(", ".join(f"{table} {count}" for table, count in counts.items()) + f" in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
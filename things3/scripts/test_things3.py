@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Regression tests for things3.py - No external dependencies required.
+Runs against a synthetic database, so Things 3 does not need to be installed.
+
+Usage:
+    python -m unittest test_things3
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synth_db  # noqa: E402
+import things3  # noqa: E402
+
+
+class IncrementalSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        env = mock.patch.dict(os.environ, {"THINGS3_CACHE_DIR": scratch.name})
+        env.start()
+        self.addCleanup(env.stop)
+        self.path = os.path.join(scratch.name, "main.sqlite")
+        synth_db.generate(self.path, todos=200)
+        things3.configure(self.path)
+        self.addCleanup(things3.close)
+        things3.configure_result_cache(max_entries=0)
+        self.index = things3.SearchIndex()
+        self.index.sync()
+    
+    def test_checklist_change_on_high_water_task(self):
+        # The task at the high-water mark is read again by the next sync
+        # anyway; a new checklist item must still get it re-indexed
+        writer = sqlite3.connect(self.path)
+        self.addCleanup(writer.close)
+        uuid, = writer.execute(
+            "SELECT uuid FROM TMTask ORDER BY userModificationDate DESC LIMIT 1"
+        ).fetchone()
+        modified, = writer.execute("SELECT max(userModificationDate) FROM TMChecklistItem").fetchone()
+        writer.execute(
+            "INSERT INTO TMChecklistItem (uuid, title, status, task, creationDate, userModificationDate) "
+            "VALUES ('CL-NEW', 'zyzzyva', 0, ?, ?, ?)",
+            (uuid, modified + 10, modified + 10),
+        )
+        writer.commit()
+        
+        self.assertEqual(self.index.sync()["rows_applied"], 1)
+        self.assertEqual([row["uuid"] for row in things3.search("zyzzyva")], [uuid])
+
+
+if __name__ == "__main__":
+    unittest.main()
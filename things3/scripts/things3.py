@@ -4,14 +4,34 @@ Things 3 Python interface - No external dependencies required.
 Reads from Things 3 SQLite database and writes via URL Scheme.
 """
 
+import abc
+import argparse
 import sqlite3
 import subprocess
+import sys
 import json
 import glob
+import io
+import marshal
+import mmap
 import os
+import atexit
+import base64
+import contextvars
+import signal
+import socket
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from operator import itemgetter
 from datetime import datetime, date
 from urllib.parse import urlencode, quote
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterator, Sequence, Tuple, Union
 
 
 # Database path pattern
@@ -19,6 +39,25 @@ DB_PATH_PATTERN = os.path.expanduser(
     "~/Library/Group Containers/JLMPQHK86H.com.culturedcode.ThingsMac/ThingsData-*/Things Database.thingsdatabase/main.sqlite"
 )
 
+# Connection tuning (see _connect)
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_CACHE_SIZE = -32 * 1024  # 32 MiB
+DEFAULT_TEMP_STORE = "MEMORY"
+
+# Rows fetched per round trip by the iter_* functions
+DEFAULT_BATCH_SIZE = 500
+
+# Parameters per IN (...) list when looking up many uuids at once
+IN_BATCH_SIZE = 500
+
+# Date decoding caches (see _things_date_to_str, _unix_to_str)
+THINGS_DATE_CACHE_SIZE = 16384
+TIMESTAMP_DAY_CACHE_SIZE = 8192
+
+# Result cache bounds (see ResultCache)
+RESULT_CACHE_ENTRIES = 256
+RESULT_CACHE_BYTES = 64 * 1024 * 1024
+
 # Task types
 TYPE_TODO = 0
 TYPE_PROJECT = 1
@@ -35,21 +74,612 @@ START_ANYTIME = 1
 START_SOMEDAY = 2
 
 
+# ============== INSTRUMENTATION ==============
+
+# Registered trace hooks: (callback, wants EXPLAIN QUERY PLAN). Replaced, never
+# mutated, under _trace_hooks_lock, so readers iterate it without locking
+_trace_hooks: Tuple[Tuple[Callable[[Dict[str, Any]], None], bool], ...] = ()
+_trace_hooks_lock = threading.Lock()
+
+# Public function currently running, reported as "call" on every span
+_trace_call: contextvars.ContextVar = contextvars.ContextVar("things3_trace_call", default=None)
+
+
+def add_trace_hook(hook: Callable[[Dict[str, Any]], None], explain: bool = False) -> None:
+    """Register a callback that receives a record per timed stage.
+    
+    Records are dicts with "span" (glob, connect, sync, execute, decode,
+    serialize, cache for a result cache hit, watch for a change feed diff,
+    or call for a whole public function), "call" (the function being run),
+    "ms", and stage details: "sql", "params" and "rows" for execute ("plan"
+    too if any hook asked for explain), "rows" for decode, call and watch,
+    "bytes" for cache.
+    
+    Tracing costs nothing while no hook is registered.
+    
+    Args:
+        hook: Called synchronously, in the reading thread
+        explain: Also run EXPLAIN QUERY PLAN for every query
+    """
+    global _trace_hooks
+    with _trace_hooks_lock:
+        _trace_hooks = _trace_hooks + ((hook, explain),)
+
+
+def remove_trace_hook(hook: Callable[[Dict[str, Any]], None]) -> None:
+    """Unregister a hook added with add_trace_hook."""
+    global _trace_hooks
+    with _trace_hooks_lock:
+        # == rather than is: spans.append is a new bound method on every access
+        _trace_hooks = tuple((h, e) for h, e in _trace_hooks if h != hook)
+
+
+def _process_trace_hooks() -> bool:
+    """Whether a hook outside any one CLI request (THINGS3_TRACE, the Python API) is set."""
+    return any(not getattr(hook, "thread_bound", False) for hook, _ in _trace_hooks)
+
+
+def _emit(span: str, seconds: float, **fields: Any) -> None:
+    record = {"span": span, "call": _trace_call.get(), "ms": round(seconds * 1e3, 3), **fields}
+    for hook, _ in _trace_hooks:
+        hook(record)
+
+
+def _trace_execute(conn: sqlite3.Connection, seconds: float, query: str, params: Tuple, rows: int) -> None:
+    """Emit an execute span, with the query plan if a hook wants it."""
+    fields: Dict[str, Any] = {"sql": " ".join(query.split()), "params": list(params), "rows": rows}
+    if any(explain for _, explain in _trace_hooks):
+        start = time.perf_counter()
+        fields["plan"] = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+        fields["plan_ms"] = round((time.perf_counter() - start) * 1e3, 3)
+    _emit("execute", seconds, **fields)
+
+
+def _traced(func: Callable) -> Callable:
+    """Report a public read function as a "call" span and tag its inner spans.
+    
+    iter_* results are wrapped so spans emitted while the iterator runs are
+    tagged too; their call span ends when the iterator is exhausted.
+    """
+    name = func.__name__
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _trace_hooks:
+            return func(*args, **kwargs)
+        token = _trace_call.set(name)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _trace_call.reset(token)
+        if name.startswith("iter_"):
+            return _traced_iter(name, result, start)
+        _emit("call", time.perf_counter() - start, call=name, rows=_result_rows(result))
+        return result
+    
+    return wrapper
+
+
+def _result_rows(result: Any) -> int:
+    """Rows in a read function's result: a list, a page dict, or one task."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and "items" in result:
+        return len(result["items"])
+    return int(result is not None)
+
+
+def _traced_iter(name: str, rows: Iterator[Dict[str, Any]], start: float) -> Iterator[Dict[str, Any]]:
+    count = 0
+    try:
+        while True:
+            token = _trace_call.set(name)
+            try:
+                row = next(rows)
+            except StopIteration:
+                break
+            finally:
+                _trace_call.reset(token)
+            count += 1
+            yield row
+    finally:
+        _emit("call", time.perf_counter() - start, call=name, rows=count)
+
+
+class TraceFile:
+    """Trace hook writing one JSON object per line, with a wall-clock "ts".
+    
+    Usage:
+        add_trace_hook(TraceFile("/tmp/things3-trace.jsonl"), explain=True)
+    """
+    
+    def __init__(self, path: str):
+        self._file = sys.stderr if path == "-" else open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+    
+    def __call__(self, record: Dict[str, Any]) -> None:
+        line = json.dumps({"ts": round(time.time(), 6), "pid": os.getpid(), **record}, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+    
+    def close(self) -> None:
+        if self._file is not sys.stderr:
+            self._file.close()
+
+
+class _Profile:
+    """Trace hook aggregating spans per (call, span) for --profile.
+    
+    Only spans emitted by the thread that created it are counted, so
+    concurrent daemon requests do not show up in each other's profiles.
+    """
+    
+    thread_bound = True
+    
+    def __init__(self):
+        self.stats: Dict[Tuple[str, str], List[float]] = {}
+        self._thread = threading.get_ident()
+    
+    def __call__(self, record: Dict[str, Any]) -> None:
+        if threading.get_ident() != self._thread:
+            return
+        entry = self.stats.setdefault((record["call"] or "-", record["span"]), [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += record["ms"]
+        entry[2] = max(entry[2], record["ms"])
+        entry[3] += record.get("rows", 0) if record["span"] != "execute" else 0
+    
+    def write(self, out) -> None:
+        out.write(f"{'call':<20} {'span':<10} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'rows':>7}\n")
+        for (call, span), (count, total, peak, rows) in self.stats.items():
+            out.write(f"{call:<20} {span:<10} {count:>6} {total:>10.3f} {total / count:>9.3f} {peak:>9.3f} {rows or '':>7}\n")
+
+
+def _trace_from_env() -> None:
+    """THINGS3_TRACE=<file> (or - for stderr) writes spans as JSON lines;
+    THINGS3_TRACE_PLAN=1 adds EXPLAIN QUERY PLAN output to execute spans."""
+    path = os.environ.get("THINGS3_TRACE")
+    if path:
+        add_trace_hook(TraceFile(path), explain=os.environ.get("THINGS3_TRACE_PLAN") == "1")
+
+
+_trace_from_env()
+
+
 def _get_db_path() -> str:
-    """Find the Things 3 database path."""
+    """Find the Things 3 database path.
+    
+    THINGS3_DB overrides the lookup, e.g. to point at a database written by
+    synth_db.py.
+    """
+    override = os.environ.get("THINGS3_DB")
+    if override:
+        if not os.path.exists(override):
+            raise FileNotFoundError(f"THINGS3_DB does not exist: {override}")
+        return override
+    start = time.perf_counter()
     paths = glob.glob(DB_PATH_PATTERN)
+    if _trace_hooks:
+        _emit("glob", time.perf_counter() - start, matches=len(paths))
     if not paths:
         raise FileNotFoundError("Things 3 database not found. Is Things 3 installed?")
     return paths[0]
 
 
-def _connect() -> sqlite3.Connection:
-    """Connect to the Things 3 database."""
-    conn = sqlite3.connect(_get_db_path())
-    conn.row_factory = sqlite3.Row
+def _connect(
+    path: Optional[str] = None,
+    immutable: bool = False,
+    mmap_size: int = DEFAULT_MMAP_SIZE,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    temp_store: str = DEFAULT_TEMP_STORE,
+) -> sqlite3.Connection:
+    """Open a read-only connection to the Things 3 database.
+    
+    The file is opened through a file: URI with mode=ro, so reads never take
+    write locks and coexist with Things writing to the WAL. query_only guards
+    against accidental writes.
+    
+    Args:
+        path: Database path (default: globbed from DB_PATH_PATTERN)
+        immutable: Open as an immutable snapshot (no locking, no WAL reads).
+            Only safe on a copy of the database that nothing writes to.
+        mmap_size: Bytes of the file to memory-map (0 disables mmap)
+        cache_size: Page cache size (negative values are KiB, as in SQLite)
+        temp_store: Where temporary tables/indexes live: DEFAULT, FILE or MEMORY
+    """
+    if temp_store.upper() not in ("DEFAULT", "FILE", "MEMORY"):
+        raise ValueError(f"Invalid temp_store: {temp_store}")
+    uri = f"file:{quote(path or _get_db_path())}?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    conn.execute(f"PRAGMA cache_size = {int(cache_size)}")
+    conn.execute(f"PRAGMA temp_store = {temp_store.upper()}")
     return conn
 
 
+class _PooledConnection:
+    """An open connection plus the state the pool tracks for it."""
+    
+    __slots__ = ("conn", "data_version", "attached")
+    
+    def __init__(self, conn: sqlite3.Connection, data_version: int):
+        self.conn = conn
+        self.data_version = data_version
+        self.attached: Dict[str, str] = {}
+
+
+class ConnectionManager:
+    """Process-wide pool of open read connections to the Things database.
+    
+    The database path is globbed once, and connections stay open between
+    calls instead of being opened and closed per query. On every checkout
+    the connection is checked for staleness:
+    - PRAGMA data_version changes when another connection (Things itself)
+      commits; `generation` is bumped so callers can drop derived state
+    - if the database file was replaced, all pooled connections are reopened
+    
+    Connections may be borrowed from any thread, one thread at a time.
+    Extra keyword arguments (immutable, mmap_size, cache_size, temp_store)
+    are passed to _connect.
+    
+    Usage:
+        with ConnectionManager() as manager:
+            with manager.connection() as conn:
+                conn.execute(...)
+    """
+    
+    def __init__(self, path: Optional[str] = None, max_idle: int = 4, **connect_options):
+        self._connect_options = connect_options
+        self._configured_path = path
+        self._path = path
+        self._file_id = None
+        self._max_idle = max_idle
+        self._idle: List[_PooledConnection] = []
+        self._attachments: Dict[str, str] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+    
+    @property
+    def path(self) -> str:
+        """Database path, resolved on first use."""
+        with self._lock:
+            if self._path is None:
+                self._path = self._configured_path or _get_db_path()
+            return self._path
+    
+    def _check_file(self) -> None:
+        """Drop pooled connections if the database file was replaced."""
+        try:
+            st = os.stat(self.path)
+            file_id = (st.st_dev, st.st_ino)
+        except OSError:
+            file_id = None
+        with self._lock:
+            if file_id == self._file_id:
+                return
+            stale, self._idle = self._idle, []
+            self._epoch += 1
+            self._file_id = file_id
+            self.generation += 1
+            if file_id is None:
+                # Re-resolve (e.g. ThingsData-* directory renamed)
+                self._path = self._configured_path
+        for pooled in stale:
+            pooled.conn.close()
+    
+    def _open(self) -> "_PooledConnection":
+        path = self.path
+        start = time.perf_counter()
+        conn = _connect(path, **self._connect_options)
+        pooled = _PooledConnection(conn, conn.execute("PRAGMA data_version").fetchone()[0])
+        if _trace_hooks:
+            _emit("connect", time.perf_counter() - start, path=path)
+        return pooled
+    
+    def _acquire(self) -> Tuple["_PooledConnection", int]:
+        self._check_file()
+        with self._lock:
+            epoch = self._epoch
+            pooled = self._idle.pop() if self._idle else None
+            attachments = dict(self._attachments)
+        if pooled is None:
+            pooled = self._open()
+        else:
+            try:
+                version = pooled.conn.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error:
+                pooled.conn.close()
+                pooled = self._open()
+                version = None
+            if version != pooled.data_version:
+                pooled.data_version = version
+                with self._lock:
+                    self.generation += 1
+        if pooled.attached != attachments:
+            self._sync_attachments(pooled, attachments)
+        return pooled, epoch
+    
+    def _sync_attachments(self, pooled: "_PooledConnection", attachments: Dict[str, str]) -> None:
+        """Attach/detach databases so the connection matches attach() calls."""
+        for name, path in list(pooled.attached.items()):
+            if attachments.get(name) != path:
+                pooled.conn.execute("DETACH DATABASE ?", (name,))
+                del pooled.attached[name]
+        for name, path in attachments.items():
+            if name not in pooled.attached:
+                pooled.conn.execute("ATTACH DATABASE ? AS ?", (f"file:{quote(path)}?mode=ro", name))
+                pooled.attached[name] = path
+    
+    def _release(self, pooled: "_PooledConnection", epoch: int) -> None:
+        with self._lock:
+            if epoch == self._epoch and len(self._idle) < self._max_idle:
+                self._idle.append(pooled)
+                return
+        pooled.conn.close()
+    
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for the duration of a with-block."""
+        pooled, epoch = self._acquire()
+        try:
+            yield pooled.conn
+        finally:
+            if pooled.conn.in_transaction:
+                pooled.conn.rollback()
+            self._release(pooled, epoch)
+    
+    def attach(self, name: str, path: str) -> None:
+        """Attach another database file, read-only, to every pooled connection.
+        
+        Applied lazily on the next checkout of each connection. Used for
+        sidecar databases (e.g. the search index) that queries join against.
+        """
+        with self._lock:
+            self._attachments[name] = path
+    
+    def close(self) -> None:
+        """Close all idle connections; borrowed ones close when returned.
+        
+        The manager stays usable and reopens connections on demand.
+        """
+        with self._lock:
+            stale, self._idle = self._idle, []
+            self._epoch += 1
+        for pooled in stale:
+            pooled.conn.close()
+    
+    def __enter__(self) -> "ConnectionManager":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# Shared by all read functions below
+_manager = ConnectionManager()
+atexit.register(lambda: _manager.close())
+
+
+def close() -> None:
+    """Close pooled database connections (reopened on next read)."""
+    _manager.close()
+
+
+def configure(path: Optional[str] = None, max_idle: int = 4, **connect_options) -> None:
+    """Replace the shared connection pool used by the read functions.
+    
+    Args:
+        path: Database path (default: globbed from DB_PATH_PATTERN)
+        max_idle: Number of idle connections kept open
+        **connect_options: immutable, mmap_size, cache_size, temp_store
+            (see _connect)
+    
+    Example:
+        # Offline analysis of a copied database
+        configure("/tmp/main.sqlite", immutable=True)
+    """
+    global _manager
+    old = _manager
+    _manager = ConnectionManager(path, max_idle=max_idle, **connect_options)
+    old.close()
+
+
+def _fetch_all(query: str, params: Tuple = (), convert: bool = True, **enrich: Any) -> List[Dict[str, Any]]:
+    """Run a query on a pooled connection and return rows as dicts.
+    
+    With convert=False rows are returned as plain dicts, without the
+    human-readable conversions of _row_to_dict. enrich options (e.g.
+    include_tags) are passed to _enrich.
+    """
+    enrich = _enrich_options(enrich)
+    if _trace_hooks:
+        return _fetch_all_traced(query, params, convert, enrich)
+    with _manager.connection() as conn:
+        cursor = conn.execute(query, params)
+        decode = _cursor_decoder(cursor, convert)
+        rows = [decode(row) for row in cursor.fetchall()]
+        if enrich:
+            _enrich(conn, rows, **enrich)
+        return rows
+
+
+def _fetch_all_traced(query: str, params: Tuple, convert: bool, enrich: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """_fetch_all with execute and decode spans."""
+    with _manager.connection() as conn:
+        start = time.perf_counter()
+        cursor = conn.execute(query, params)
+        rows = cursor.fetchall()
+        _trace_execute(conn, time.perf_counter() - start, query, params, len(rows))
+        start = time.perf_counter()
+        decode = _cursor_decoder(cursor, convert)
+        result = [decode(row) for row in rows]
+        _emit("decode", time.perf_counter() - start, rows=len(result))
+        if enrich:
+            _enrich(conn, result, **enrich)
+        return result
+
+
+def _iter_rows(
+    query: str,
+    params: Tuple = (),
+    convert: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    **enrich: Any,
+) -> Iterator[Dict[str, Any]]:
+    """Run a query and yield decoded rows lazily, batch_size rows per fetch.
+    
+    The pooled connection is held until the iterator is exhausted or closed,
+    so consume or close() it promptly. Nothing runs until the first next().
+    enrich options are applied to each fetched batch (see _enrich).
+    """
+    enrich = _enrich_options(enrich)
+    if _trace_hooks:
+        yield from _iter_rows_traced(query, params, convert, batch_size, enrich)
+        return
+    with _manager.connection() as conn:
+        cursor = conn.execute(query, params)
+        try:
+            decode = _cursor_decoder(cursor, convert)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if enrich:
+                    batch = [decode(row) for row in rows]
+                    _enrich(conn, batch, **enrich)
+                    yield from batch
+                else:
+                    for row in rows:
+                        yield decode(row)
+        finally:
+            cursor.close()
+
+
+def _iter_rows_traced(
+    query: str, params: Tuple, convert: bool, batch_size: int, enrich: Dict[str, Any]
+) -> Iterator[Dict[str, Any]]:
+    """_iter_rows with execute and decode spans (summed over batches, emitted at the end)."""
+    execute_time = decode_time = 0.0
+    count = 0
+    with _manager.connection() as conn:
+        start = time.perf_counter()
+        cursor = conn.execute(query, params)
+        execute_time += time.perf_counter() - start
+        try:
+            decode = _cursor_decoder(cursor, convert)
+            while True:
+                start = time.perf_counter()
+                rows = cursor.fetchmany(batch_size)
+                execute_time += time.perf_counter() - start
+                if not rows:
+                    break
+                start = time.perf_counter()
+                batch = [decode(row) for row in rows]
+                decode_time += time.perf_counter() - start
+                count += len(batch)
+                if enrich:
+                    _enrich(conn, batch, **enrich)
+                yield from batch
+        finally:
+            cursor.close()
+            _trace_execute(conn, execute_time, query, params, count)
+            _emit("decode", decode_time, rows=count)
+
+
+def _page_scope(kind: str, *args: Any) -> str:
+    """Identify the listing a page token belongs to (kind plus its arguments)."""
+    return f"{kind}:{zlib.crc32(json.dumps(args).encode()):08x}"
+
+
+def _encode_page_token(scope: str, key: Any, uuid: str) -> str:
+    """Opaque continuation token holding the sort key of the last row returned."""
+    raw = json.dumps([scope, key, uuid], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_page_token(scope: str, token: str) -> Tuple[Any, str]:
+    """Inverse of _encode_page_token; raises ValueError for foreign or broken tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        token_scope, key, uuid = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page token: {token!r}") from e
+    if token_scope != scope:
+        raise ValueError("Page token belongs to a different listing")
+    return key, uuid
+
+
+def _keyset_query(
+    scope: str, select: str, params: Tuple, key_column: str, page_size: int, page_token: Optional[str]
+) -> Tuple[str, Tuple]:
+    """Wrap a SELECT ... WHERE ... into one keyset page (page_size + 1 rows).
+    
+    Rows are ordered by key_column DESC, uuid DESC with NULL keys last. The
+    continuation is split into the non-NULL part (a plain range on
+    key_column, so SQLite can seek an index on it) followed by the NULL tail.
+    """
+    limit = page_size + 1
+    if not page_token:
+        query = f"{select} ORDER BY {key_column} DESC, uuid DESC LIMIT ?"
+        return query, params + (limit,)
+    key, uuid = _decode_page_token(scope, page_token)
+    if key is None:
+        query = f"{select} AND {key_column} IS NULL AND uuid < ? ORDER BY uuid DESC LIMIT ?"
+        return query, params + (uuid, limit)
+    query = f"""
+        SELECT * FROM ({select} AND ({key_column}, uuid) < (?, ?)
+                       ORDER BY {key_column} DESC, uuid DESC LIMIT ?)
+        UNION ALL
+        SELECT * FROM ({select} AND {key_column} IS NULL ORDER BY uuid DESC LIMIT ?)
+        LIMIT ?
+    """
+    return query, params + (key, uuid, limit) + params + (limit, limit)
+
+
+def _fetch_page(
+    scope: str, query: str, params: Tuple, page_size: int, key_column: str, **enrich: Any
+) -> Dict[str, Any]:
+    """Run a keyset-paginated query (which must fetch page_size + 1 rows).
+    
+    Returns:
+        {"items": [...], "next_page_token": str, or None on the last page}
+    """
+    enrich = _enrich_options(enrich)
+    with _manager.connection() as conn:
+        start = time.perf_counter()
+        cursor = conn.execute(query, params)
+        rows = cursor.fetchall()
+        if _trace_hooks:
+            _trace_execute(conn, time.perf_counter() - start, query, params, len(rows))
+        decode = _cursor_decoder(cursor)
+        next_token = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            columns = [d[0] for d in cursor.description]
+            last = rows[-1]
+            next_token = _encode_page_token(
+                scope, last[columns.index(key_column)], last[columns.index("uuid")]
+            )
+        start = time.perf_counter()
+        items = [decode(row) for row in rows]
+        if _trace_hooks:
+            _emit("decode", time.perf_counter() - start, rows=len(items))
+        if enrich:
+            _enrich(conn, items, **enrich)
+    return {"items": items, "next_page_token": next_token}
+
+
+def _check_page_size(page_size: int) -> None:
+    if page_size < 1:
+        raise ValueError(f"page_size must be positive, got {page_size}")
+
+
+@lru_cache(maxsize=THINGS_DATE_CACHE_SIZE)
 def _things_date_to_str(things_date: Optional[int]) -> Optional[str]:
     """Convert Things date integer to ISO date string.
     
@@ -58,6 +688,8 @@ def _things_date_to_str(things_date: Optional[int]) -> Optional[str]:
     - 4 bits for month
     - 5 bits for day
     - 7 bits unused (zeros)
+    
+    Memoized: a database only holds a few thousand distinct dates.
     """
     if things_date is None or things_date == 0:
         return None
@@ -79,10 +711,57 @@ def _things_date_to_str(things_date: Optional[int]) -> Optional[str]:
         return None
 
 
+# Unix day 0 (1970-01-01) as a proleptic Gregorian ordinal
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Timestamps handled by the fast path (1970 up to ~year 6000)
+_FAST_TIMESTAMP_MAX = 2 ** 37
+
+# "HH:MM:" for every minute of the day and "SS" for every second
+_CLOCK_MINUTES = [f"{h:02d}:{m:02d}:" for h in range(24) for m in range(60)]
+_CLOCK_SECONDS = [f"{s:02d}" for s in range(60)]
+
+# [fast path, slow path] conversions done by _unix_to_str
+_timestamp_stats = [0, 0]
+
+
+@lru_cache(maxsize=TIMESTAMP_DAY_CACHE_SIZE)
+def _utc_day_offset(utc_day: int) -> Optional[int]:
+    """Local UTC offset (seconds) in effect for a whole UTC day.
+    
+    Returns None if the offset changes during the day (DST transition).
+    """
+    start = utc_day * 86400
+    offsets = {time.localtime(t).tm_gmtoff for t in (start, start + 43200, start + 86399)}
+    return offsets.pop() if len(offsets) == 1 else None
+
+
+@lru_cache(maxsize=TIMESTAMP_DAY_CACHE_SIZE)
+def _local_day_prefix(local_day: int) -> str:
+    """'YYYY-MM-DD ' for a day number counted from 1970-01-01."""
+    return date.fromordinal(_EPOCH_ORDINAL + local_day).isoformat() + " "
+
+
 def _unix_to_str(timestamp: Optional[float]) -> Optional[str]:
-    """Convert Unix timestamp to ISO datetime string."""
+    """Convert Unix timestamp to ISO datetime string.
+    
+    Fast path: the local UTC offset and the date prefix are cached per day,
+    and the time of day comes from precomputed "HH:MM:" / "SS" tables, so no
+    datetime is built and nothing is formatted per row. Falls back to
+    datetime.fromtimestamp for DST transition days, timestamps outside the
+    fast range, and fractions that round up to the next second.
+    """
     if timestamp is None:
         return None
+    if 0 <= timestamp < _FAST_TIMESTAMP_MAX:
+        seconds = int(timestamp)
+        if timestamp - seconds < 0.999999:
+            offset = _utc_day_offset(seconds // 86400)
+            if offset is not None:
+                _timestamp_stats[0] += 1
+                local_day, second_of_day = divmod(seconds + offset, 86400)
+                minute_of_day, second = divmod(second_of_day, 60)
+                return _local_day_prefix(local_day) + _CLOCK_MINUTES[minute_of_day] + _CLOCK_SECONDS[second]
+    _timestamp_stats[1] += 1
     # creationDate/userModificationDate/stopDate use standard Unix epoch (1970)
     try:
         dt = datetime.fromtimestamp(timestamp)
@@ -91,342 +770,2970 @@ def _unix_to_str(timestamp: Optional[float]) -> Optional[str]:
         return None
 
 
-def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
-    """Convert a database row to a dictionary with human-readable values."""
-    d = dict(row)
+def decode_cache_info() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters of the date decoding caches.
     
-    # Convert type
-    type_map = {TYPE_TODO: "to-do", TYPE_PROJECT: "project", TYPE_HEADING: "heading"}
-    d["type"] = type_map.get(d.get("type"), d.get("type"))
+    Returns:
+        things_date: memoized _things_date_to_str
+        utc_offset / local_day: per-day caches behind the timestamp fast path
+        timestamps: conversions taking the fast and the slow path
+    """
+    def info(cached) -> Dict[str, int]:
+        stats = cached.cache_info()
+        return {"hits": stats.hits, "misses": stats.misses,
+                "size": stats.currsize, "maxsize": stats.maxsize}
     
-    # Convert status
-    status_map = {STATUS_INCOMPLETE: "incomplete", STATUS_CANCELED: "canceled", STATUS_COMPLETED: "completed"}
-    d["status"] = status_map.get(d.get("status"), d.get("status"))
+    return {
+        "things_date": info(_things_date_to_str),
+        "utc_offset": info(_utc_day_offset),
+        "local_day": info(_local_day_prefix),
+        "timestamps": {"fast": _timestamp_stats[0], "slow": _timestamp_stats[1]},
+    }
+
+
+def clear_decode_caches() -> None:
+    """Reset the date decoding caches and counters (e.g. after changing TZ)."""
+    _things_date_to_str.cache_clear()
+    _utc_day_offset.cache_clear()
+    _local_day_prefix.cache_clear()
+    _timestamp_stats[:] = [0, 0]
+
+
+# Human-readable values for enum columns
+_TYPE_NAMES = {TYPE_TODO: "to-do", TYPE_PROJECT: "project", TYPE_HEADING: "heading"}
+_STATUS_NAMES = {STATUS_INCOMPLETE: "incomplete", STATUS_CANCELED: "canceled", STATUS_COMPLETED: "completed"}
+_START_NAMES = {START_INBOX: "Inbox", START_ANYTIME: "Anytime", START_SOMEDAY: "Someday"}
+_ENUM_COLUMNS = {"type": "_type_names", "status": "_status_names", "start": "_start_names"}
+
+# Date columns renamed in output, appended after the other keys in this order
+_RENAMED_DATE_COLUMNS = [
+    ("startDate", "start_date", "_things_date_to_str"),
+    ("creationDate", "created", "_unix_to_str"),
+    ("userModificationDate", "modified", "_unix_to_str"),
+    ("stopDate", "stop_date", "_unix_to_str"),
+]
+
+# Compiled decoders keyed by (column names, convert)
+_decoders: Dict[Tuple[Tuple[str, ...], bool], Callable[[tuple], Dict[str, Any]]] = {}
+
+
+def _compile_decoder(
+    columns: Tuple[str, ...], convert: bool, positions: Optional[Tuple[int, ...]] = None
+) -> Callable[[tuple], Dict[str, Any]]:
+    """Generate a decoder function for one column set.
     
-    # Convert start
-    start_map = {START_INBOX: "Inbox", START_ANYTIME: "Anytime", START_SOMEDAY: "Someday"}
-    d["start"] = start_map.get(d.get("start"), d.get("start"))
+    The function body is a single dict literal with fixed tuple positions,
+    so decoding a row does no key lookups or branching on missing columns.
+    positions, if given, are the tuple indexes of the columns (for rows
+    carrying extra columns); by default column i is row[i].
+    """
+    positions = positions or tuple(range(len(columns)))
+    index = {col: positions[i] for i, col in enumerate(columns)}
+    renamed = {col for col, _, _ in _RENAMED_DATE_COLUMNS}
+    fields = []
+    for i, col in zip(positions, columns):
+        if not convert:
+            fields.append((col, f"row[{i}]"))
+        elif col in _ENUM_COLUMNS:
+            names = _ENUM_COLUMNS[col]
+            fields.append((col, f"{names}(row[{i}], row[{i}])"))
+        elif col == "deadline":
+            fields.append((col, f"_things_date_to_str(row[{i}])"))
+        elif col not in renamed:
+            fields.append((col, f"row[{i}]"))
+    if convert:
+        fields += [(col, "None") for col in _ENUM_COLUMNS if col not in index]
+        fields += [
+            (key, f"{func}(row[{index[col]}])")
+            for col, key, func in _RENAMED_DATE_COLUMNS
+            if col in index
+        ]
     
-    # Convert dates
-    if "startDate" in d:
-        d["start_date"] = _things_date_to_str(d.pop("startDate"))
-    if "deadline" in d:
-        d["deadline"] = _things_date_to_str(d.get("deadline"))
-    if "creationDate" in d:
-        d["created"] = _unix_to_str(d.pop("creationDate"))
-    if "userModificationDate" in d:
-        d["modified"] = _unix_to_str(d.pop("userModificationDate"))
-    if "stopDate" in d:
-        d["stop_date"] = _unix_to_str(d.pop("stopDate"))
+    body = ", ".join(f"{key!r}: {expr}" for key, expr in fields)
+    namespace = {
+        "_type_names": _TYPE_NAMES.get,
+        "_status_names": _STATUS_NAMES.get,
+        "_start_names": _START_NAMES.get,
+        "_things_date_to_str": _things_date_to_str,
+        "_unix_to_str": _unix_to_str,
+    }
+    exec(f"def decode(row):\n    return {{{body}}}", namespace)
+    return namespace["decode"]
+
+
+def _row_decoder(columns: Tuple[str, ...], convert: bool = True) -> Callable[[tuple], Dict[str, Any]]:
+    """Get the (cached) decoder turning row tuples into dicts for these columns.
     
-    return d
+    With convert=True the result matches _row_to_dict: enum values are named,
+    Things dates and timestamps become ISO strings and renamed date keys
+    (start_date, created, modified, stop_date) come last.
+    """
+    key = (columns, convert)
+    decoder = _decoders.get(key)
+    if decoder is None:
+        decoder = _decoders[key] = _compile_decoder(columns, convert)
+    return decoder
 
 
-# ============== READ OPERATIONS ==============
+def _cursor_decoder(cursor: sqlite3.Cursor, convert: bool = True) -> Callable[[tuple], Dict[str, Any]]:
+    """Get the decoder for a cursor's column set (from cursor.description)."""
+    return _row_decoder(tuple(d[0] for d in cursor.description), convert)
 
-def _today_thingsdate() -> int:
-    """Get today's date as Things date format."""
-    d = date.today()
-    return (d.year << 16) | (d.month << 12) | (d.day << 7)
 
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a database row to a dictionary with human-readable values."""
+    return _row_decoder(tuple(row.keys()))(tuple(row))
 
-def today() -> List[Dict[str, Any]]:
-    """Get today's tasks.
+
+# ============== ENRICHMENT ==============
+
+class _TagIndex:
+    """Tag titles and hierarchy, loaded once per database change.
     
-    Includes:
-    - Regular today tasks (scheduled for today or earlier, start=Anytime)
-    - Unconfirmed scheduled tasks (past start_date, start=Someday) - yellow dot
-    - Unconfirmed overdue tasks (no start_date, overdue deadline)
+    descendants maps every tag uuid to the frozenset of itself and all tags
+    below it (TMTag.parent closure), so hierarchy queries are set lookups.
     """
-    conn = _connect()
-    today_int = _today_thingsdate()
     
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               todayIndex, project, area, creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND status = 0
-          AND type = 0
-          AND rt1_recurrenceRule IS NULL
-          AND (
-              -- Regular today tasks
-              (start = 1 AND startDate IS NOT NULL AND startDate <= ?)
-              -- Unconfirmed scheduled tasks (yellow dot)
-              OR (start = 2 AND startDate IS NOT NULL AND startDate <= ?)
-              -- Unconfirmed overdue tasks
-              OR (startDate IS NULL AND deadline IS NOT NULL AND deadline < ? AND deadlineSuppressionDate IS NULL)
-          )
-        ORDER BY todayIndex, startDate
+    __slots__ = ("titles", "order", "by_title", "descendants")
+    
+    def __init__(self, rows: List[Tuple[str, str, Optional[str]]]):
+        # rows: (uuid, title, parent) in Things' tag order
+        self.titles = {uuid: title for uuid, title, _ in rows}
+        self.order = {uuid: i for i, (uuid, _, _) in enumerate(rows)}
+        self.by_title: Dict[str, List[str]] = {}
+        children: Dict[str, List[str]] = {}
+        for uuid, title, parent in rows:
+            self.by_title.setdefault(title, []).append(uuid)
+            if parent:
+                children.setdefault(parent, []).append(uuid)
+        self.descendants: Dict[str, frozenset] = {}
+        for uuid in self.titles:
+            seen, stack = {uuid}, [uuid]
+            while stack:
+                for child in children.get(stack.pop(), ()):
+                    if child not in seen:  # also guards against parent cycles
+                        seen.add(child)
+                        stack.append(child)
+            self.descendants[uuid] = frozenset(seen)
+
+
+# Lookup tables loaded from the database: name -> (manager, generation, value)
+_lookup_cache: Dict[str, Tuple[Any, int, Any]] = {}
+
+
+def _cached_lookup(conn: sqlite3.Connection, name: str, load: Callable[[sqlite3.Connection], Any]) -> Any:
+    """load(conn), cached until the pool sees the database change.
+    
+    conn must be borrowed from _manager (checkout refreshes its generation).
     """
-    cursor = conn.execute(query, (today_int, today_int, today_int))
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    cached = _lookup_cache.get(name)
+    if cached is not None and cached[0] is _manager and cached[1] == _manager.generation:
+        return cached[2]
+    generation = _manager.generation
+    value = load(conn)
+    _lookup_cache[name] = (_manager, generation, value)
+    return value
 
 
-def inbox() -> List[Dict[str, Any]]:
-    """Get inbox tasks."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND status = 0
-          AND type = 0
-          AND rt1_recurrenceRule IS NULL
-          AND start = 0
-        ORDER BY "index"
+def _tag_index(conn: sqlite3.Connection) -> _TagIndex:
+    """The cached tag index (see _cached_lookup)."""
+    return _cached_lookup(
+        conn, "tags", lambda c: _TagIndex(c.execute('SELECT uuid, title, parent FROM TMTag ORDER BY "index"').fetchall())
+    )
+
+
+def _container_titles(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Cached uuid -> title of every area, project and heading (see _cached_lookup)."""
+    return _cached_lookup(conn, "containers", lambda c: dict(c.execute(f"""
+        SELECT uuid, title FROM TMTask WHERE type != {TYPE_TODO}
+        UNION ALL
+        SELECT uuid, title FROM TMArea
+    """).fetchall()))
+
+
+def _current_tag_index() -> _TagIndex:
+    """The cached tag index, borrowing a pooled connection if it must be loaded."""
+    with _manager.connection() as conn:
+        return _tag_index(conn)
+
+
+def _tag_uuids(index: _TagIndex, tag: str, expand: bool = False) -> frozenset:
+    """uuids of a tag given by title or uuid, plus its descendants if expand."""
+    uuids = index.by_title.get(tag) or ([tag] if tag in index.titles else [])
+    if expand:
+        return frozenset().union(*(index.descendants[uuid] for uuid in uuids))
+    return frozenset(uuids)
+
+
+def tag_descendants(tag: str) -> List[str]:
+    """Titles of a tag and every tag nested below it, in Things' tag order.
+    
+    Args:
+        tag: Tag title or uuid
     """
-    cursor = conn.execute(query)
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    index = _current_tag_index()
+    found = _tag_uuids(index, tag, expand=True)
+    return [index.titles[uuid] for uuid in sorted(found, key=index.order.get)]
 
 
-def upcoming() -> List[Dict[str, Any]]:
-    """Get upcoming tasks (scheduled for future, start=Someday)."""
-    conn = _connect()
-    today_int = _today_thingsdate()
+# Tag titles or uuids for the all_tags/any_tags/exclude_tags filters
+TagNames = Optional[Union[str, Sequence[str]]]
+
+# (EXISTS or NOT EXISTS, tag uuids) conditions, as built by _tag_filter
+TagFilter = List[Tuple[str, frozenset]]
+
+
+def _tag_filter(
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> Optional[TagFilter]:
+    """Resolve tag filter arguments to uuid sets (None when there is no filter).
     
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               project, area, creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND status = 0
-          AND type = 0
-          AND rt1_recurrenceRule IS NULL
-          AND start = 2
-          AND startDate IS NOT NULL
-          AND startDate > ?
-        ORDER BY startDate, "index"
+    Unknown tags match nothing: requiring one empties the result, excluding
+    one has no effect.
     """
-    cursor = conn.execute(query, (today_int,))
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    names = [[t] if isinstance(t, str) else list(t or ()) for t in (all_tags, any_tags, exclude_tags)]
+    if not any(names):
+        return None
+    index = _current_tag_index()
+    required, anyof, excluded = ([_tag_uuids(index, t, expand_tags) for t in group] for group in names)
+    conditions = [("EXISTS", uuids) for uuids in required]
+    if anyof:
+        conditions.append(("EXISTS", frozenset().union(*anyof)))
+    if excluded:
+        conditions.append(("NOT EXISTS", frozenset().union(*excluded)))
+    return conditions
 
 
-def anytime() -> List[Dict[str, Any]]:
-    """Get anytime tasks (start=Anytime, no scheduled date)."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               project, area, creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND status = 0
-          AND type = 0
-          AND rt1_recurrenceRule IS NULL
-          AND start = 1
-        ORDER BY "index"
+def _tag_condition(column: str, tag_filter: Optional[TagFilter]) -> Tuple[str, Tuple]:
+    """SQL ("AND ..." or "") and parameters applying a tag filter to a task uuid column.
+    
+    Each condition is a correlated EXISTS / NOT EXISTS probe of TMTaskTag
+    through its tasks index, so only candidate rows of the outer query pay
+    for it. Tag sets larger than IN_BATCH_SIZE are passed as one JSON array.
     """
-    cursor = conn.execute(query)
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    if not tag_filter:
+        return "", ()
+    sql, params = [], []
+    for exists, uuids in tag_filter:
+        uuids = sorted(uuids)
+        if len(uuids) > IN_BATCH_SIZE:
+            members = "SELECT value FROM json_each(?)"
+            params.append(json.dumps(uuids))
+        else:
+            members = ", ".join("?" * len(uuids))
+            params.extend(uuids)
+        sql.append(f"AND {exists} (SELECT 1 FROM TMTaskTag WHERE tasks = {column} AND tags IN ({members}))")
+    return "\n          ".join(sql), tuple(params)
 
 
-def someday() -> List[Dict[str, Any]]:
-    """Get someday tasks (no start_date, start=Someday)."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               project, area, creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND status = 0
-          AND type = 0
-          AND rt1_recurrenceRule IS NULL
-          AND start = 2
-          AND startDate IS NULL
-        ORDER BY "index"
+def _attach_tags(conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> None:
+    """Set row["tags"] to tag titles for a batch of tasks, one IN query per chunk."""
+    index = _tag_index(conn)
+    by_task: Dict[str, List[str]] = {}
+    for chunk in _chunks(list(dict.fromkeys(row["uuid"] for row in rows))):
+        marks = ", ".join("?" * len(chunk))
+        for task, tag in conn.execute(f"SELECT tasks, tags FROM TMTaskTag WHERE tasks IN ({marks})", chunk):
+            if tag in index.titles:
+                by_task.setdefault(task, []).append(tag)
+    order = index.order.get
+    titles = index.titles
+    for row in rows:
+        tags = by_task.get(row["uuid"])
+        row["tags"] = [titles[tag] for tag in sorted(tags, key=order)] if tags else []
+
+
+# Checklist item columns, as returned under "checklist"
+_CHECKLIST_QUERY = """
+    SELECT task, uuid, title, status, stopDate
+    FROM TMChecklistItem
+"""
+
+
+def _checklist_item(row: tuple) -> Dict[str, Any]:
+    """Decode a _CHECKLIST_QUERY row, without its task.
+    
+    Not the task decoder: that would pad items with the type and start
+    columns tasks have.
+    """
+    _, uuid, title, status, stop_date = row
+    return {
+        "uuid": uuid, "title": title,
+        "status": _STATUS_NAMES.get(status, status), "stop_date": _unix_to_str(stop_date),
+    }
+
+
+def _attach_checklist(conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> None:
+    """Set row["checklist"] to checklist items in order, one IN query per chunk."""
+    items: Dict[str, List[Dict[str, Any]]] = {}
+    for chunk in _chunks(list(dict.fromkeys(row["uuid"] for row in rows))):
+        marks = ", ".join("?" * len(chunk))
+        for row in conn.execute(f'{_CHECKLIST_QUERY} WHERE task IN ({marks}) ORDER BY task, "index"', chunk):
+            items.setdefault(row[0], []).append(_checklist_item(row))
+    for row in rows:
+        row["checklist"] = list(items.get(row["uuid"], ()))
+
+
+def _attach_progress(conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> None:
+    """Set row["checklist_progress"] from a per-task aggregate, without reading items."""
+    progress: Dict[str, Tuple[int, int]] = {}
+    for chunk in _chunks(list(dict.fromkeys(row["uuid"] for row in rows))):
+        marks = ", ".join("?" * len(chunk))
+        for task, done, total in conn.execute(f"""
+            SELECT task, sum(status != 0), count(*)
+            FROM TMChecklistItem
+            WHERE task IN ({marks})
+            GROUP BY task
+        """, chunk):
+            progress[task] = (done, total)
+    for row in rows:
+        done, total = progress.get(row["uuid"], (0, 0))
+        row["checklist_progress"] = {"done": done, "total": total}
+
+
+# Reference columns resolved by expand, and the key each title goes to
+_EXPANDED_COLUMNS = (("project", "project_title"), ("area", "area_title"), ("heading", "heading_title"))
+
+
+def _expand_titles(conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> None:
+    """Add project_title / area_title / heading_title next to the uuids a row has."""
+    titles = _container_titles(conn).get
+    present = [(column, key) for column, key in _EXPANDED_COLUMNS if column in rows[0]]
+    for row in rows:
+        for column, key in present:
+            uuid = row[column]
+            row[key] = titles(uuid) if uuid else None
+
+
+def _enrich_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """The _enrich options that are switched on (public functions pass them all)."""
+    return {option: value for option, value in options.items() if value}
+
+
+def _enrich(
+    conn: sqlite3.Connection,
+    rows: List[Dict[str, Any]],
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> None:
+    """Add optional related data to decoded task rows, in place.
+    
+    Called per fetched batch on the connection that read the rows, so each
+    option costs a fixed number of queries per batch rather than per task.
+    
+    Args:
+        include_tags: Add "tags" (tag titles in Things' order)
+        include_checklist: Add "checklist" (items in order)
+        include_progress: Add "checklist_progress" ({"done": n, "total": n},
+            done meaning completed or canceled), counted in SQL
+        expand: Add the titles of the row's project, area and heading
+            (project_title etc.) from a cached uuid -> title map
+    """
+    if not rows:
+        return
+    start = time.perf_counter()
+    if include_tags:
+        _attach_tags(conn, rows)
+    if include_checklist:
+        _attach_checklist(conn, rows)
+    if include_progress:
+        _attach_progress(conn, rows)
+    if expand:
+        _expand_titles(conn, rows)
+    if _trace_hooks:
+        _emit("enrich", time.perf_counter() - start, rows=len(rows))
+
+
+# ============== RESULT CACHE ==============
+
+class ResultCache:
+    """LRU cache of read function results, dropped whenever the database changes.
+    
+    Entries are stored marshalled: the size bound counts real bytes, and each
+    hit returns a fresh copy that callers may modify. All entries belong to
+    one database state (see _result_state); a lookup under any other state
+    empties the cache first, so nothing written by Things is ever missed.
+    
+    Thread-safe; bounded by max_entries and max_bytes (0 entries disables it).
+    """
+    
+    def __init__(self, max_entries: int = RESULT_CACHE_ENTRIES, max_bytes: int = RESULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._state: Optional[Tuple] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+    
+    def lookup(self, key: bytes, state: Tuple) -> Optional[bytes]:
+        """Marshalled result for key, or None (counted as a miss)."""
+        with self._lock:
+            if state != self._state:
+                if self._entries:
+                    self._stats["invalidations"] += 1
+                self._drop()
+                self._state = state
+            data = self._entries.get(key)
+            if data is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return data
+    
+    def store(self, key: bytes, state: Tuple, data: bytes) -> None:
+        """Add a result read under state, evicting least recently used entries."""
+        size = len(key) + len(data)
+        with self._lock:
+            if state != self._state or size > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(key) + len(old)
+            self._entries[key] = data
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted_key) + len(evicted)
+                self._stats["evictions"] += 1
+    
+    def _drop(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+    
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._drop()
+            self._state = None
+            self._stats = dict.fromkeys(self._stats, 0)
+    
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._bytes,
+                    "max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+
+_result_cache = ResultCache()
+
+
+def _result_state() -> Tuple:
+    """What every cached result depends on besides its arguments.
+    
+    Checking out a connection refreshes the pool's generation (bumped on
+    PRAGMA data_version changes); the mtime and size of main.sqlite and its
+    WAL also catch writes that immutable connections cannot see. Today's
+    date is included because the list views depend on it.
+    """
+    with _manager.connection():
+        pass
+    return _manager, _manager.generation, _db_signature(_manager.path), _today_thingsdate()
+
+
+def _cached(func: Callable) -> Callable:
+    """Serve repeated calls of a read function from _result_cache.
+    
+    Keyed by function name and arguments. Hits are reported as a "cache" span.
+    completed() and completed_page() are not cached: their cutoff moves with
+    the clock.
+    """
+    name = func.__name__
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _result_cache.max_entries <= 0:
+            return func(*args, **kwargs)
+        try:
+            key = marshal.dumps((name, args, sorted(kwargs.items())))
+        except ValueError:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        state = _result_state()
+        data = _result_cache.lookup(key, state)
+        if data is not None:
+            result = marshal.loads(data)
+            if _trace_hooks:
+                _emit("cache", time.perf_counter() - start, bytes=len(data))
+            return result
+        result = func(*args, **kwargs)
+        _result_cache.store(key, state, marshal.dumps(result))
+        return result
+    
+    return wrapper
+
+
+def result_cache_info() -> Dict[str, int]:
+    """Counters and size of the result cache.
+    
+    Returns:
+        {"hits", "misses", "evictions", "invalidations" (times the database
+         changed and the cache was emptied), "entries", "bytes",
+         "max_entries", "max_bytes"}
+    """
+    return _result_cache.info()
+
+
+def clear_result_cache() -> None:
+    """Drop all cached results and reset the counters."""
+    _result_cache.clear()
+
+
+def configure_result_cache(max_entries: int = RESULT_CACHE_ENTRIES, max_bytes: int = RESULT_CACHE_BYTES) -> None:
+    """Resize the result cache; max_entries=0 turns it off.
+    
+    Args:
+        max_entries: Results kept, least recently used evicted first
+        max_bytes: Total marshalled size kept; larger results are not cached
+    """
+    global _result_cache
+    _result_cache = ResultCache(max_entries, max_bytes)
+
+
+# ============== READ OPERATIONS ==============
+
+def _today_thingsdate() -> int:
+    """Get today's date as Things date format."""
+    d = date.today()
+    return (d.year << 16) | (d.month << 12) | (d.day << 7)
+
+
+def _today_query(tag_filter: Optional[TagFilter] = None) -> Tuple[str, Tuple]:
+    """SQL and parameters for today()."""
+    today_int = _today_thingsdate()
+    
+    tag_sql, tag_params = _tag_condition("TMTask.uuid", tag_filter)
+    query = f"""
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               todayIndex, project, area, creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND status = 0
+          AND type = 0
+          AND rt1_recurrenceRule IS NULL
+          AND (
+              -- Regular today tasks
+              (start = 1 AND startDate IS NOT NULL AND startDate <= ?)
+              -- Unconfirmed scheduled tasks (yellow dot)
+              OR (start = 2 AND startDate IS NOT NULL AND startDate <= ?)
+              -- Unconfirmed overdue tasks
+              OR (startDate IS NULL AND deadline IS NOT NULL AND deadline < ? AND deadlineSuppressionDate IS NULL)
+          )
+          {tag_sql}
+        ORDER BY todayIndex, startDate
+    """
+    return query, (today_int, today_int, today_int) + tag_params
+
+
+@_traced
+@_cached
+def today(
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get today's tasks.
+    
+    Includes:
+    - Regular today tasks (scheduled for today or earlier, start=Anytime)
+    - Unconfirmed scheduled tasks (past start_date, start=Someday) - yellow dot
+    - Unconfirmed overdue tasks (no start_date, overdue deadline)
+    
+    Tag filters (also taken by upcoming, anytime, someday, deadlines, search):
+        all_tags: Only tasks with every one of these tags (titles or uuids)
+        any_tags: Only tasks with at least one of these tags
+        exclude_tags: Leave out tasks with any of these tags
+        expand_tags: Let each tag also match the tags nested below it
+    """
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _fetch_all(
+        *_today_query(tag_filter),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_today(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream today() results lazily (see _iter_rows)."""
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _iter_rows(
+        *_today_query(tag_filter), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _inbox_query() -> Tuple[str, Tuple]:
+    """SQL and parameters for inbox()."""
+    query = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND status = 0
+          AND type = 0
+          AND rt1_recurrenceRule IS NULL
+          AND start = 0
+        ORDER BY "index"
+    """
+    return query, ()
+
+
+@_traced
+@_cached
+def inbox(
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get inbox tasks."""
+    return _fetch_all(
+        *_inbox_query(),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_inbox(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream inbox() results lazily (see _iter_rows)."""
+    return _iter_rows(
+        *_inbox_query(), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _upcoming_query(tag_filter: Optional[TagFilter] = None) -> Tuple[str, Tuple]:
+    """SQL and parameters for upcoming()."""
+    today_int = _today_thingsdate()
+    
+    tag_sql, tag_params = _tag_condition("TMTask.uuid", tag_filter)
+    query = f"""
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND status = 0
+          AND type = 0
+          AND rt1_recurrenceRule IS NULL
+          AND start = 2
+          AND startDate IS NOT NULL
+          AND startDate > ?
+          {tag_sql}
+        ORDER BY startDate, "index"
+    """
+    return query, (today_int,) + tag_params
+
+
+@_traced
+@_cached
+def upcoming(
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get upcoming tasks (scheduled for future, start=Someday).
+    
+    Takes the tag filters of today().
+    """
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _fetch_all(
+        *_upcoming_query(tag_filter),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_upcoming(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream upcoming() results lazily (see _iter_rows)."""
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _iter_rows(
+        *_upcoming_query(tag_filter), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _anytime_query(tag_filter: Optional[TagFilter] = None) -> Tuple[str, Tuple]:
+    """SQL and parameters for anytime()."""
+    tag_sql, tag_params = _tag_condition("TMTask.uuid", tag_filter)
+    query = f"""
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND status = 0
+          AND type = 0
+          AND rt1_recurrenceRule IS NULL
+          AND start = 1
+          {tag_sql}
+        ORDER BY "index"
+    """
+    return query, tag_params
+
+
+@_traced
+@_cached
+def anytime(
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get anytime tasks (start=Anytime, no scheduled date).
+    
+    Takes the tag filters of today().
+    """
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _fetch_all(
+        *_anytime_query(tag_filter),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_anytime(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream anytime() results lazily (see _iter_rows)."""
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _iter_rows(
+        *_anytime_query(tag_filter), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _someday_query(tag_filter: Optional[TagFilter] = None) -> Tuple[str, Tuple]:
+    """SQL and parameters for someday()."""
+    tag_sql, tag_params = _tag_condition("TMTask.uuid", tag_filter)
+    query = f"""
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND status = 0
+          AND type = 0
+          AND rt1_recurrenceRule IS NULL
+          AND start = 2
+          AND startDate IS NULL
+          {tag_sql}
+        ORDER BY "index"
+    """
+    return query, tag_params
+
+
+@_traced
+@_cached
+def someday(
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get someday tasks (no start_date, start=Someday).
+    
+    Takes the tag filters of today().
+    """
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _fetch_all(
+        *_someday_query(tag_filter),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_someday(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream someday() results lazily (see _iter_rows)."""
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _iter_rows(
+        *_someday_query(tag_filter), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _projects_query() -> Tuple[str, Tuple]:
+    """SQL and parameters for projects()."""
+    query = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               area, creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND type = 1
+          AND status = 0
+          AND rt1_recurrenceRule IS NULL
+        ORDER BY "index"
+    """
+    return query, ()
+
+
+@_traced
+@_cached
+def projects(
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get all projects."""
+    return _fetch_all(
+        *_projects_query(),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_projects(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream projects() results lazily (see _iter_rows)."""
+    return _iter_rows(
+        *_projects_query(), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _areas_query() -> Tuple[str, Tuple]:
+    """SQL and parameters for areas()."""
+    query = """
+        SELECT uuid, title
+        FROM TMArea 
+        WHERE visible = 1
+        ORDER BY "index"
+    """
+    return query, ()
+
+
+@_traced
+@_cached
+def areas() -> List[Dict[str, Any]]:
+    """Get all areas."""
+    return _fetch_all(*_areas_query(), convert=False)
+
+
+@_traced
+def iter_areas(batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Stream areas() results lazily (see _iter_rows)."""
+    return _iter_rows(*_areas_query(), convert=False, batch_size=batch_size)
+
+
+def _tags_query() -> Tuple[str, Tuple]:
+    """SQL and parameters for tags()."""
+    query = """
+        SELECT uuid, title, shortcut, parent
+        FROM TMTag 
+        ORDER BY "index"
+    """
+    return query, ()
+
+
+@_traced
+@_cached
+def tags() -> List[Dict[str, Any]]:
+    """Get all tags."""
+    return _fetch_all(*_tags_query(), convert=False)
+
+
+@_traced
+def iter_tags(batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Stream tags() results lazily (see _iter_rows)."""
+    return _iter_rows(*_tags_query(), convert=False, batch_size=batch_size)
+
+
+def _completed_query(last_days: int = 7) -> Tuple[str, Tuple]:
+    """SQL and parameters for completed()."""
+    # Mac epoch timestamp for N days ago
+    mac_epoch = datetime(2001, 1, 1)
+    cutoff = (datetime.now() - mac_epoch).total_seconds() - (last_days * 86400)
+    
+    query = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate, stopDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND status = 3
+          AND type = 0
+          AND stopDate > ?
+        ORDER BY stopDate DESC
+    """
+    return query, (cutoff,)
+
+
+@_traced
+def completed(
+    last_days: int = 7,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get completed tasks from last N days."""
+    return _fetch_all(
+        *_completed_query(last_days),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_completed(
+    last_days: int = 7,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream completed() results lazily (see _iter_rows)."""
+    return _iter_rows(
+        *_completed_query(last_days), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _completed_page_query(last_days: int, page_size: int, page_token: Optional[str]) -> Tuple[str, Tuple]:
+    """SQL and parameters for completed_page()."""
+    mac_epoch = datetime(2001, 1, 1)
+    cutoff = (datetime.now() - mac_epoch).total_seconds() - (last_days * 86400)
+    
+    select = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate, stopDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND status = 3
+          AND type = 0
+          AND stopDate > ?
+    """
+    return _keyset_query(
+        _page_scope("completed", last_days), select, (cutoff,), "stopDate", page_size, page_token
+    )
+
+
+@_traced
+def completed_page(
+    last_days: int = 7,
+    page_size: int = 100,
+    page_token: Optional[str] = None,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Dict[str, Any]:
+    """Get one page of tasks completed in the last N days, newest first.
+    
+    Keyset-paginated on (stopDate, uuid): every page costs the same no matter
+    how deep into the history it is.
+    
+    Args:
+        last_days: Look back N days
+        page_size: Tasks per page
+        page_token: next_page_token from the previous page (None for the first)
+        include_tags, include_checklist, include_progress, expand: Add tags,
+            checklist items, checklist progress and container titles (see _enrich)
+    
+    Returns:
+        {"items": [...], "next_page_token": str, or None on the last page}
+    """
+    _check_page_size(page_size)
+    query, params = _completed_page_query(last_days, page_size, page_token)
+    return _fetch_page(
+        _page_scope("completed", last_days), query, params, page_size, "stopDate",
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _logbook_query() -> Tuple[str, Tuple]:
+    """SQL and parameters for logbook()."""
+    query = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate, stopDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND (status = 3 OR status = 2)
+          AND type = 0
+        ORDER BY stopDate DESC
+        LIMIT 100
+    """
+    return query, ()
+
+
+@_traced
+@_cached
+def logbook(
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get logbook (completed and canceled tasks)."""
+    return _fetch_all(
+        *_logbook_query(),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_logbook(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream logbook() results lazily (see _iter_rows)."""
+    return _iter_rows(
+        *_logbook_query(), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _logbook_page_query(page_size: int, page_token: Optional[str]) -> Tuple[str, Tuple]:
+    """SQL and parameters for logbook_page()."""
+    select = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate, stopDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND (status = 3 OR status = 2)
+          AND type = 0
+    """
+    return _keyset_query(_page_scope("logbook"), select, (), "stopDate", page_size, page_token)
+
+
+@_traced
+@_cached
+def logbook_page(
+    page_size: int = 100,
+    page_token: Optional[str] = None,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Dict[str, Any]:
+    """Get one page of the logbook (completed and canceled tasks), newest first.
+    
+    Keyset-paginated on (stopDate, uuid), so walking the whole history costs
+    the same per page. See completed_page() for arguments and return value.
+    """
+    _check_page_size(page_size)
+    query, params = _logbook_page_query(page_size, page_token)
+    return _fetch_page(
+        _page_scope("logbook"), query, params, page_size, "stopDate",
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _search_query(
+    query_str: str, fts_query: Optional[str] = None, tag_filter: Optional[TagFilter] = None
+) -> Tuple[str, Tuple]:
+    """SQL and parameters for search().
+    
+    With fts_query, matches go through the attached search index, best bm25
+    rank first (title weighted highest); otherwise LIKE over title/notes.
+    """
+    if fts_query:
+        # Rank inside the index first, then join only the top hits. The tag
+        # filter goes inside, so it does not eat into the 50 hits.
+        tag_sql, tag_params = _tag_condition("task_fts.uuid", tag_filter)
+        query = f"""
+            SELECT t.uuid, t.title, t.notes, t.type, t.status, t.start, t.startDate, t.deadline,
+                   t.project, t.area, t.creationDate, t.userModificationDate
+            FROM (
+                SELECT uuid, bm25(task_fts, 0.0, 10.0, 1.0, 5.0, 2.0) AS score
+                FROM search_index.task_fts
+                WHERE task_fts MATCH ?
+                  {tag_sql}
+                ORDER BY score
+                LIMIT 50
+            ) hits
+            JOIN TMTask t ON t.uuid = hits.uuid
+            WHERE t.trashed = 0
+            ORDER BY hits.score
+        """
+        return query, (fts_query,) + tag_params
+    pattern = f"%{query_str}%"
+    tag_sql, tag_params = _tag_condition("TMTask.uuid", tag_filter)
+    query = f"""
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND (title LIKE ? OR notes LIKE ?)
+          {tag_sql}
+        ORDER BY userModificationDate DESC
+        LIMIT 50
+    """
+    return query, (pattern, pattern) + tag_params
+
+
+def _search_fts_query(query_str: str, fts: bool) -> Optional[str]:
+    """FTS5 expression for query_str if the search index can serve it."""
+    if not fts:
+        return None
+    fts_query = _fts_query(query_str)
+    if fts_query is None or _ready_search_index() is None:
+        return None
+    return fts_query
+
+
+@_traced
+@_cached
+def search(
+    query_str: str,
+    fts: bool = True,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> List[Dict[str, Any]]:
+    """Search tasks by title, notes, tags and checklist items (top 50).
+    
+    Uses the FTS5 sidecar index (SearchIndex): bm25-ranked, words match as
+    prefixes and "quoted text" as a phrase. Falls back to a LIKE scan of
+    title/notes, newest first, when FTS5 is unavailable or fts=False.
+    Takes the tag filters of today().
+    """
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _fetch_all(
+        *_search_query(query_str, _search_fts_query(query_str, fts), tag_filter),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_search(
+    query_str: str,
+    fts: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream search() results lazily (see _iter_rows)."""
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _iter_rows(
+        *_search_query(query_str, _search_fts_query(query_str, fts), tag_filter), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _search_page_scope(query_str: str, fts_query: Optional[str], tag_filter: Optional[TagFilter]) -> str:
+    """Page token scope of a search: the query, FTS or LIKE matching, and the tag filter."""
+    tags = [(kind, sorted(uuids)) for kind, uuids in tag_filter or ()]
+    return _page_scope("search", query_str, fts_query is not None, tags)
+
+
+def _search_page_query(
+    query_str: str,
+    page_size: int,
+    page_token: Optional[str],
+    fts_query: Optional[str] = None,
+    tag_filter: Optional[TagFilter] = None,
+) -> Tuple[str, Tuple]:
+    """SQL and parameters for search_page()."""
+    if fts_query:
+        select = """
+            SELECT uuid, title, notes, type, status, start, startDate, deadline,
+                   project, area, creationDate, userModificationDate
+            FROM TMTask 
+            WHERE trashed = 0 
+              AND uuid IN (SELECT uuid FROM search_index.task_fts WHERE task_fts MATCH ?)
+        """
+        params = (fts_query,)
+    else:
+        pattern = f"%{query_str}%"
+        select = """
+            SELECT uuid, title, notes, type, status, start, startDate, deadline,
+                   project, area, creationDate, userModificationDate
+            FROM TMTask 
+            WHERE trashed = 0 
+              AND (title LIKE ? OR notes LIKE ?)
+        """
+        params = (pattern, pattern)
+    tag_sql, tag_params = _tag_condition("TMTask.uuid", tag_filter)
+    if tag_sql:
+        select += f"{tag_sql}\n"
+    return _keyset_query(
+        _search_page_scope(query_str, fts_query, tag_filter), select, params + tag_params,
+        "userModificationDate", page_size, page_token,
+    )
+
+
+@_traced
+@_cached
+def search_page(
+    query_str: str,
+    page_size: int = 50,
+    page_token: Optional[str] = None,
+    fts: bool = True,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> Dict[str, Any]:
+    """Get one page of search results, most recently modified first.
+    
+    Matching is the same as search(); pages are keyset-paginated on
+    (userModificationDate, uuid). See completed_page() for arguments and
+    return value.
+    """
+    _check_page_size(page_size)
+    fts_query = _search_fts_query(query_str, fts)
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    query, params = _search_page_query(query_str, page_size, page_token, fts_query, tag_filter)
+    return _fetch_page(
+        _search_page_scope(query_str, fts_query, tag_filter), query, params, page_size, "userModificationDate",
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _get_query(uuid: str) -> Tuple[str, Tuple]:
+    """SQL and parameters for get()."""
+    query = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, heading, creationDate, userModificationDate, stopDate
+        FROM TMTask 
+        WHERE uuid = ?
+    """
+    return query, (uuid,)
+
+
+@_traced
+@_cached
+def get(
+    uuid: str,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """Get a specific task by UUID."""
+    rows = _fetch_all(
+        *_get_query(uuid),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+    return rows[0] if rows else None
+
+
+def _get_many_query(uuids: Sequence[str]) -> Tuple[str, Tuple]:
+    """SQL and parameters for one get_many() chunk."""
+    marks = ", ".join("?" * len(uuids))
+    query = f"""
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, heading, creationDate, userModificationDate, stopDate
+        FROM TMTask 
+        WHERE uuid IN ({marks})
+    """
+    return query, tuple(uuids)
+
+
+@_traced
+@_cached
+def get_many(
+    uuids: Sequence[str],
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Dict[str, Any]:
+    """Get many tasks by UUID on one connection, IN_BATCH_SIZE uuids per query.
+    
+    Args:
+        uuids: Task uuids; repeated ones are looked up and returned once
+        include_tags, include_checklist, include_progress, expand: As for get()
+    
+    Returns:
+        {"items": [task, ...] in input order, "missing": [uuid, ...] not found}
+    """
+    wanted = list(dict.fromkeys(uuids))
+    found: Dict[str, Dict[str, Any]] = {}
+    with _manager.connection() as conn:
+        for chunk in _chunks(wanted):
+            query, params = _get_many_query(chunk)
+            start = time.perf_counter()
+            cursor = conn.execute(query, params)
+            rows = cursor.fetchall()
+            if _trace_hooks:
+                _trace_execute(conn, time.perf_counter() - start, query, params, len(rows))
+            start = time.perf_counter()
+            decode = _cursor_decoder(cursor)
+            for row in rows:
+                task = decode(row)
+                found[task["uuid"]] = task
+            if _trace_hooks:
+                _emit("decode", time.perf_counter() - start, rows=len(rows))
+        items = [found[uuid] for uuid in wanted if uuid in found]
+        enrich = _enrich_options(dict(
+            include_tags=include_tags, include_checklist=include_checklist,
+            include_progress=include_progress, expand=expand,
+        ))
+        if enrich:
+            _enrich(conn, items, **enrich)
+    return {"items": items, "missing": [uuid for uuid in wanted if uuid not in found]}
+
+
+def _deadlines_query(tag_filter: Optional[TagFilter] = None) -> Tuple[str, Tuple]:
+    """SQL and parameters for deadlines()."""
+    tag_sql, tag_params = _tag_condition("TMTask.uuid", tag_filter)
+    query = f"""
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND status = 0
+          AND type = 0
+          AND deadline IS NOT NULL
+          {tag_sql}
+        ORDER BY deadline
+    """
+    return query, tag_params
+
+
+@_traced
+@_cached
+def deadlines(
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get tasks with deadlines. Takes the tag filters of today()."""
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _fetch_all(
+        *_deadlines_query(tag_filter),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_deadlines(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+    *,
+    all_tags: TagNames = None,
+    any_tags: TagNames = None,
+    exclude_tags: TagNames = None,
+    expand_tags: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream deadlines() results lazily (see _iter_rows)."""
+    tag_filter = _tag_filter(all_tags, any_tags, exclude_tags, expand_tags)
+    return _iter_rows(
+        *_deadlines_query(tag_filter), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _project_todos_query(project_uuid: str) -> Tuple[str, Tuple]:
+    """SQL and parameters for project_todos()."""
+    query = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               heading, creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND type = 0
+          AND project = ?
+        ORDER BY "index"
+    """
+    return query, (project_uuid,)
+
+
+@_traced
+@_cached
+def project_todos(
+    project_uuid: str,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get todos for a specific project."""
+    return _fetch_all(
+        *_project_todos_query(project_uuid),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_project_todos(
+    project_uuid: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream project_todos() results lazily (see _iter_rows)."""
+    return _iter_rows(
+        *_project_todos_query(project_uuid), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+def _area_items_query(area_uuid: str) -> Tuple[str, Tuple]:
+    """SQL and parameters for area_items()."""
+    query = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, creationDate, userModificationDate
+        FROM TMTask 
+        WHERE trashed = 0 
+          AND area = ?
+          AND status = 0
+        ORDER BY type, "index"
+    """
+    return query, (area_uuid,)
+
+
+@_traced
+@_cached
+def area_items(
+    area_uuid: str,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> List[Dict[str, Any]]:
+    """Get todos and projects for a specific area."""
+    return _fetch_all(
+        *_area_items_query(area_uuid),
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+@_traced
+def iter_area_items(
+    area_uuid: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Stream area_items() results lazily (see _iter_rows)."""
+    return _iter_rows(
+        *_area_items_query(area_uuid), batch_size=batch_size,
+        include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+        expand=expand,
+    )
+
+
+# ============== DASHBOARD ==============
+
+# Views dashboard() can return, with the query builder each one mirrors
+_DASHBOARD_VIEWS: Dict[str, Callable[[], Tuple[str, Tuple]]] = {
+    "today": lambda: _today_query(),
+    "inbox": lambda: _inbox_query(),
+    "upcoming": lambda: _upcoming_query(),
+    "anytime": lambda: _anytime_query(),
+    "someday": lambda: _someday_query(),
+    "deadlines": lambda: _deadlines_query(),
+}
+
+# Candidates for every view in one scan: the union of their WHERE clauses.
+# views is a bitmask (bit i = i-th entry of _DASHBOARD_VIEWS), each bit
+# repeating that view's WHERE clause; the sort_* columns are its ORDER BY
+# keys with NULL mapped to -Inf, so Python sorts them like SQLite does.
+_DASHBOARD_QUERY = """
+    SELECT uuid, title, notes, type, status, start, startDate, deadline,
+           todayIndex, project, area, creationDate, userModificationDate,
+           CASE WHEN rt1_recurrenceRule IS NULL AND (
+                    (start = 1 AND startDate IS NOT NULL AND startDate <= :today)
+                    OR (start = 2 AND startDate IS NOT NULL AND startDate <= :today)
+                    OR (startDate IS NULL AND deadline IS NOT NULL AND deadline < :today
+                        AND deadlineSuppressionDate IS NULL)
+                ) THEN 1 ELSE 0 END
+           | CASE WHEN rt1_recurrenceRule IS NULL AND start = 0 THEN 2 ELSE 0 END
+           | CASE WHEN rt1_recurrenceRule IS NULL AND start = 2
+                       AND startDate IS NOT NULL AND startDate > :today THEN 4 ELSE 0 END
+           | CASE WHEN rt1_recurrenceRule IS NULL AND start = 1 THEN 8 ELSE 0 END
+           | CASE WHEN rt1_recurrenceRule IS NULL AND start = 2 AND startDate IS NULL THEN 16 ELSE 0 END
+           | CASE WHEN deadline IS NOT NULL THEN 32 ELSE 0 END AS views,
+           IFNULL(todayIndex, -9e999) AS sort_today_index,
+           IFNULL(startDate, -9e999) AS sort_start_date,
+           IFNULL("index", -9e999) AS sort_index,
+           IFNULL(deadline, -9e999) AS sort_deadline
+    FROM TMTask
+    WHERE trashed = 0
+      AND status = 0
+      AND type = 0
+      AND (rt1_recurrenceRule IS NULL OR deadline IS NOT NULL)
+"""
+
+# ORDER BY of each view, as _DASHBOARD_QUERY sort columns
+_DASHBOARD_SORT = {
+    "today": ("sort_today_index", "sort_start_date"),
+    "inbox": ("sort_index",),
+    "upcoming": ("sort_start_date", "sort_index"),
+    "anytime": ("sort_index",),
+    "someday": ("sort_index",),
+    "deadlines": ("sort_deadline",),
+}
+
+
+@lru_cache(maxsize=None)
+def _dashboard_plan(view: str, columns: Tuple[str, ...]) -> Tuple[int, Callable, Callable]:
+    """(view bit, sort key, decoder) for one view over _DASHBOARD_QUERY rows.
+    
+    The decoder is compiled for the view's own columns, read from their
+    positions in the wider dashboard row, so the dicts match exactly.
+    """
+    query = _DASHBOARD_VIEWS[view]()[0]
+    view_columns = tuple(c.strip() for c in query.split("SELECT", 1)[1].split("FROM", 1)[0].split(","))
+    decode = _compile_decoder(view_columns, True, tuple(columns.index(c) for c in view_columns))
+    sort_key = itemgetter(*(columns.index(c) for c in _DASHBOARD_SORT[view]))
+    return 1 << list(_DASHBOARD_VIEWS).index(view), sort_key, decode
+
+
+@_traced
+@_cached
+def dashboard(
+    views: Optional[List[str]] = None,
+    include_tags: bool = False,
+    include_checklist: bool = False,
+    include_progress: bool = False,
+    expand: bool = False,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Get several built-in lists from a single scan of TMTask.
+    
+    Each list is exactly what the function of the same name returns (same
+    rows, order and keys). SQLite reads the candidates once and tags each
+    row with the views it belongs to; rows are then sorted and decoded per
+    view in Python instead of running one query per list.
+    
+    Args:
+        views: Any of today, inbox, upcoming, anytime, someday, deadlines
+            (default: all, in that order)
+        include_tags, include_checklist, include_progress, expand: Add tags,
+            checklist items, checklist progress and container titles (see _enrich)
+    
+    Returns:
+        {view: [task, ...]}
+    """
+    views = list(views or _DASHBOARD_VIEWS)
+    unknown = [v for v in views if v not in _DASHBOARD_VIEWS]
+    if unknown:
+        raise ValueError(f"unknown view(s): {', '.join(unknown)}")
+    with _manager.connection() as conn:
+        result = _dashboard_views(conn, views)
+        if include_tags or include_checklist or include_progress or expand:
+            _enrich(
+                conn, [task for tasks in result.values() for task in tasks],
+                include_tags=include_tags, include_checklist=include_checklist, include_progress=include_progress,
+                expand=expand,
+            )
+    return result
+
+
+def _dashboard_views(conn: sqlite3.Connection, views: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Run _DASHBOARD_QUERY and split, sort and decode its rows per view."""
+    params = {"today": _today_thingsdate()}
+    start = time.perf_counter()
+    cursor = conn.execute(_DASHBOARD_QUERY, params)
+    rows = cursor.fetchall()
+    if _trace_hooks:
+        _trace_execute(conn, time.perf_counter() - start, _DASHBOARD_QUERY, params, len(rows))
+    columns = tuple(d[0] for d in cursor.description)
+    mask_index = columns.index("views")
+    
+    start = time.perf_counter()
+    result = {}
+    for view in views:
+        bit, sort_key, decode = _dashboard_plan(view, columns)
+        matches = [row for row in rows if row[mask_index] & bit]
+        matches.sort(key=sort_key)
+        result[view] = [decode(row) for row in matches]
+    if _trace_hooks:
+        _emit("decode", time.perf_counter() - start, rows=sum(map(len, result.values())))
+    return result
+
+
+# Same as dashboard(): every built-in list view at once
+all_lists = dashboard
+
+
+# ============== COUNTS ==============
+
+# One aggregate over open, non-trashed rows. Each list column repeats the
+# WHERE clause of the function it counts; rows are grouped by project (to-dos
+# under a heading count towards the heading's project) and area, and the
+# groups are summed in Python.
+_COUNTS_QUERY = """
+    SELECT IFNULL(t.project, h.project) AS project_uuid, t.area,
+           sum(t.type = 0 AND t.rt1_recurrenceRule IS NULL AND (
+                   (t.start = 1 AND t.startDate IS NOT NULL AND t.startDate <= :today)
+                   OR (t.start = 2 AND t.startDate IS NOT NULL AND t.startDate <= :today)
+                   OR (t.startDate IS NULL AND t.deadline IS NOT NULL AND t.deadline < :today
+                       AND t.deadlineSuppressionDate IS NULL)
+               )) AS today,
+           sum(t.type = 0 AND t.rt1_recurrenceRule IS NULL AND t.start = 0) AS inbox,
+           sum(t.type = 0 AND t.rt1_recurrenceRule IS NULL AND t.start = 2
+               AND t.startDate IS NOT NULL AND t.startDate > :today) AS upcoming,
+           sum(t.type = 0 AND t.rt1_recurrenceRule IS NULL AND t.start = 1) AS anytime,
+           sum(t.type = 0 AND t.rt1_recurrenceRule IS NULL AND t.start = 2
+               AND t.startDate IS NULL) AS someday,
+           sum(t.type = 0 AND t.deadline IS NOT NULL) AS deadlines,
+           sum(t.type = 0 AND t.rt1_recurrenceRule IS NULL) AS open_todos,
+           count(*) AS open_items
+    FROM TMTask t
+    LEFT JOIN TMTask h ON h.uuid = t.heading
+    WHERE t.trashed = 0
+      AND t.status = 0
+    GROUP BY project_uuid, t.area
+"""
+
+_COUNTED_LISTS = ("today", "inbox", "upcoming", "anytime", "someday", "deadlines")
+
+
+@_traced
+@_cached
+def counts() -> Dict[str, Any]:
+    """Get badge counts without fetching any tasks.
+    
+    List counts use the same filters as today(), inbox(), upcoming(),
+    anytime(), someday() and deadlines(), so they equal len() of those.
+    
+    Returns:
+        {"today": n, "inbox": n, "upcoming": n, "anytime": n, "someday": n,
+         "deadlines": n,
+         "projects": {uuid: open to-dos, including those under headings},
+         "areas": {uuid: open items directly in the area, as area_items()}}
+    """
+    params = {"today": _today_thingsdate()}
+    with _manager.connection() as conn:
+        start = time.perf_counter()
+        groups = conn.execute(_COUNTS_QUERY, params).fetchall()
+        if _trace_hooks:
+            _trace_execute(conn, time.perf_counter() - start, _COUNTS_QUERY, params, len(groups))
+    
+    result: Dict[str, Any] = dict.fromkeys(_COUNTED_LISTS, 0)
+    projects: Dict[str, int] = {}
+    areas: Dict[str, int] = {}
+    for project, area, *list_counts, open_todos, open_items in groups:
+        for name, n in zip(_COUNTED_LISTS, list_counts):
+            result[name] += n
+        if project is not None and open_todos:
+            projects[project] = projects.get(project, 0) + open_todos
+        if area is not None:
+            areas[area] = areas.get(area, 0) + open_items
+    result["projects"] = projects
+    result["areas"] = areas
+    return result
+
+# ============== TREE ==============
+
+def _tree_tasks_query(active_only: bool) -> Tuple[str, Tuple]:
+    """SQL and parameters for every project, heading and to-do in tree()."""
+    query = """
+        SELECT uuid, title, notes, type, status, start, startDate, deadline,
+               project, area, heading, creationDate, userModificationDate, stopDate
+        FROM TMTask
+        WHERE trashed = 0
+          AND rt1_recurrenceRule IS NULL
+    """
+    if active_only:
+        query += "      AND status = 0\n"
+    return query + '        ORDER BY "index"\n', ()
+
+
+def _checklist_by_task() -> Dict[str, List[Dict[str, Any]]]:
+    """Checklist items of every task, in one query: {task uuid: [item, ...]}."""
+    query = f'{_CHECKLIST_QUERY} ORDER BY task, "index"'
+    with _manager.connection() as conn:
+        start = time.perf_counter()
+        rows = conn.execute(query).fetchall()
+        if _trace_hooks:
+            _trace_execute(conn, time.perf_counter() - start, query, (), len(rows))
+    items: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        items.setdefault(row[0], []).append(_checklist_item(row))
+    return items
+
+
+def _tag_titles_by_task() -> Dict[str, List[str]]:
+    """Tag titles of every tagged task, in one query: {task uuid: [title, ...]}."""
+    query = "SELECT tasks, tags FROM TMTaskTag"
+    with _manager.connection() as conn:
+        index = _tag_index(conn)
+        start = time.perf_counter()
+        rows = conn.execute(query).fetchall()
+        if _trace_hooks:
+            _trace_execute(conn, time.perf_counter() - start, query, (), len(rows))
+    by_task: Dict[str, List[str]] = {}
+    for task, tag in rows:
+        if tag in index.titles:
+            by_task.setdefault(task, []).append(tag)
+    order, titles = index.order.get, index.titles
+    return {task: [titles[tag] for tag in sorted(tags, key=order)] for task, tags in by_task.items()}
+
+
+@_traced
+def iter_tree(
+    active_only: bool = True, include_checklist: bool = False, include_tags: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """Yield the Area -> Project -> Heading -> To-do hierarchy, one top-level node at a time.
+    
+    Everything is loaded with a constant number of queries (areas, tasks, and
+    optionally checklist items and tags) and stitched together by uuid, so
+    the cost does not grow with the number of projects.
+    
+    Top-level nodes, in order:
+    - areas ({"type": "area", uuid, title, "projects": [...], "todos": [...]})
+    - projects without an area
+    - to-dos outside any area or project (e.g. the Inbox)
+    Projects carry "headings" (each with "todos") and "todos" not under a
+    heading. A to-do whose heading or project was filtered out is attached
+    one level up.
+    
+    Args:
+        active_only: Only open tasks (default); otherwise completed and
+            canceled ones too. Trashed tasks are always left out.
+        include_checklist: Add "checklist" (items in order) to every to-do
+        include_tags: Add "tags" (titles) to every project and to-do
+    """
+    area_nodes = {row["uuid"]: {"type": "area", **row, "projects": [], "todos": []} for row in areas()}
+    tasks = _fetch_all(*_tree_tasks_query(active_only))
+    checklist = _checklist_by_task() if include_checklist else None
+    tags = _tag_titles_by_task() if include_tags else None
+    
+    # Containers first: SQL order is by "index", which says nothing about
+    # whether a heading comes before its to-dos
+    projects = {t["uuid"]: t for t in tasks if t["type"] == "project"}
+    headings = {t["uuid"]: t for t in tasks if t["type"] == "heading"}
+    for project in projects.values():
+        project["headings"], project["todos"] = [], []
+    for heading in headings.values():
+        heading["todos"] = []
+    
+    loose_projects, loose_todos = [], []
+    for task in tasks:
+        kind = task["type"]
+        if include_tags and kind != "heading":
+            task["tags"] = tags.get(task["uuid"], [])
+        if kind == "project":
+            area = area_nodes.get(task["area"])
+            (area["projects"] if area else loose_projects).append(task)
+        elif kind == "heading":
+            project = projects.get(task["project"])
+            if project is not None:
+                project["headings"].append(task)
+        else:
+            if include_checklist:
+                task["checklist"] = checklist.get(task["uuid"], [])
+            heading = headings.get(task["heading"])
+            project = projects.get(task["project"] or (heading and heading["project"]))
+            area = area_nodes.get(task["area"] or (project and project["area"]))
+            if heading is not None and project is not None:
+                heading["todos"].append(task)
+            elif project is not None:
+                project["todos"].append(task)
+            elif area is not None:
+                area["todos"].append(task)
+            else:
+                loose_todos.append(task)
+    
+    yield from area_nodes.values()
+    yield from loose_projects
+    yield from loose_todos
+
+
+@_traced
+@_cached
+def tree(
+    active_only: bool = True, include_checklist: bool = False, include_tags: bool = False
+) -> List[Dict[str, Any]]:
+    """Get the whole Area -> Project -> Heading -> To-do hierarchy (see iter_tree)."""
+    return list(iter_tree(active_only, include_checklist, include_tags))
+
+# ============== SEARCH INDEX ==============
+
+def _cache_dir(create: bool = True) -> str:
+    """Directory for derived data such as the search index (created on demand).
+    
+    THINGS3_CACHE_DIR overrides the default (~/Library/Caches/things3-skill on
+    macOS, $XDG_CACHE_HOME/things3-skill elsewhere).
+    
+    Args:
+        create: Create the directory if it does not exist yet
+    """
+    path = os.environ.get("THINGS3_CACHE_DIR")
+    if not path:
+        if sys.platform == "darwin":
+            base = os.path.expanduser("~/Library/Caches")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        path = os.path.join(base, "things3-skill")
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _sidecar_path(name: str, db_path: str, extension: str = ".sqlite") -> str:
+    """Path of a sidecar file derived from a specific Things database."""
+    return os.path.join(_cache_dir(), f"{name}-{zlib.crc32(db_path.encode()):08x}{extension}")
+
+
+def _db_signature(db_path: str) -> List[int]:
+    """mtime and size of main.sqlite and its WAL; changes whenever Things writes.
+    
+    An empty WAL counts as missing: readers create one without changing data.
+    """
+    signature = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        signature += [st.st_mtime_ns, st.st_size] if st and st.st_size else [0, 0]
+    return signature
+
+
+@lru_cache(maxsize=None)
+def _fts5_available() -> bool:
+    """Whether this SQLite build has the FTS5 extension."""
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def _fts_query(query_str: str) -> Optional[str]:
+    """Translate user input into an FTS5 MATCH expression.
+    
+    - "quoted text" becomes a phrase query
+    - every other word becomes a prefix query (meet matches meeting)
+    - all parts must match
+    Returns None if nothing searchable is left.
+    """
+    parts = []
+    for i, chunk in enumerate(query_str.split('"')):
+        if i % 2:
+            if chunk.strip():
+                parts.append('"' + chunk.strip() + '"')
+        else:
+            for word in chunk.split():
+                word = word.strip("*")
+                if word:
+                    parts.append('"' + word.replace('"', "") + '"*')
+    return " ".join(parts) or None
+
+
+def _chunks(items: List[Any], size: int = IN_BATCH_SIZE) -> Iterator[List[Any]]:
+    """Split a list into slices small enough for an IN (...) parameter list."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class IncrementalSync(abc.ABC):
+    """Keeps a derived sidecar store in step with TMTask without full rebuilds.
+    
+    State kept in the sidecar database:
+    - a high-water mark of TMTask.userModificationDate (and of
+      TMChecklistItem.userModificationDate, plus a fingerprint of TMTag)
+    - sync_rows: every TMTask uuid seen, with its source rowid and
+      modification date, and a local integer id subclasses can key on
+    
+    Each sync() reads only rows modified since the high-water mark. Deletions
+    are detected cheaply by comparing (count, sum of rowids) of TMTask with
+    the same fingerprint over sync_rows; only on a mismatch are the uuid
+    sets diffed in full. The first sync is such a full diff.
+    
+    Subclasses implement _schema() and _apply() to create and update their
+    derived data.
+    """
+    
+    name = "sync"
+    
+    def __init__(self, manager: Optional[ConnectionManager] = None, path: Optional[str] = None):
+        self._manager = manager
+        self._path = path
+        self.last_stats: Optional[Dict[str, Any]] = None
+    
+    @property
+    def manager(self) -> ConnectionManager:
+        return self._manager or _manager
+    
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            self._path = _sidecar_path(self.name, self.manager.path)
+        return self._path
+    
+    @abc.abstractmethod
+    def _schema(self) -> str:
+        """Extra CREATE statements for the subclass's derived tables."""
+    
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS sync_rows (
+                id INTEGER PRIMARY KEY,
+                uuid TEXT UNIQUE NOT NULL,
+                source_rowid INTEGER NOT NULL,
+                modified REAL
+            );
+        """ + self._schema())
+        return conn
+    
+    @abc.abstractmethod
+    def _apply(
+        self, sidecar: sqlite3.Connection, src: sqlite3.Connection,
+        changed: Dict[str, int], deleted: Dict[str, int],
+    ) -> None:
+        """Update derived data. Both maps are uuid -> sync_rows.id."""
+    
+    def sync(self, full: bool = False) -> Dict[str, Any]:
+        """Apply changes since the last sync.
+        
+        Args:
+            full: Diff every uuid even if the fingerprint matches
+        
+        Returns:
+            {"rows_scanned": source rows read, "rows_applied": changed rows
+             applied, "rows_deleted": rows removed, "full_diff": whether uuid
+             sets were diffed, "skipped": database untouched since last sync,
+             "elapsed": seconds}
+        """
+        start = time.perf_counter()
+        stats = {"rows_scanned": 0, "rows_applied": 0, "rows_deleted": 0,
+                 "full_diff": False, "skipped": False}
+        signature = json.dumps(_db_signature(self.manager.path))
+        sidecar = self._open()
+        try:
+            if not full and self._state(sidecar).get("signature") == signature:
+                stats["skipped"] = True
+            else:
+                sidecar.execute("BEGIN IMMEDIATE")
+                # Another process may have synced while we waited for the lock
+                if not full and self._state(sidecar).get("signature") == signature:
+                    stats["skipped"] = True
+                else:
+                    with self.manager.connection() as src:
+                        # One read transaction: every query sees the same snapshot
+                        src.execute("BEGIN")
+                        try:
+                            self._sync(sidecar, src, full, stats)
+                        finally:
+                            src.rollback()
+                    self._set_state(sidecar, signature=signature)
+                sidecar.commit()
+        finally:
+            sidecar.close()
+        stats["elapsed"] = time.perf_counter() - start
+        self.last_stats = stats
+        if _trace_hooks:
+            _emit("sync", stats["elapsed"], index=self.name, **{k: v for k, v in stats.items() if k != "elapsed"})
+        return stats
+    
+    @staticmethod
+    def _state(sidecar: sqlite3.Connection) -> Dict[str, Any]:
+        return {k: json.loads(v) for k, v in sidecar.execute("SELECT key, value FROM sync_state")}
+    
+    @staticmethod
+    def _set_state(sidecar: sqlite3.Connection, **values: Any) -> None:
+        sidecar.executemany(
+            "INSERT OR REPLACE INTO sync_state VALUES (?, ?)",
+            [(k, json.dumps(v)) for k, v in values.items()],
+        )
+    
+    def _sync(self, sidecar: sqlite3.Connection, src: sqlite3.Connection, full: bool, stats: Dict[str, Any]) -> None:
+        state = self._state(sidecar)
+        known = {}  # uuid -> (id, source_rowid, modified), loaded lazily
+        candidates: Dict[str, Tuple[int, Optional[float]]] = {}  # uuid -> (rowid, modified)
+        
+        def load_known() -> None:
+            if not known:
+                for row_id, uuid, rowid, modified in sidecar.execute(
+                    "SELECT id, uuid, source_rowid, modified FROM sync_rows"
+                ):
+                    known[uuid] = (row_id, rowid, modified)
+        
+        # 1. Tasks modified since the high-water mark
+        hwm = state.get("task_hwm")
+        if hwm is not None:
+            for uuid, rowid, modified in src.execute(
+                "SELECT uuid, rowid, userModificationDate FROM TMTask WHERE userModificationDate >= ?",
+                (hwm,),
+            ):
+                candidates[uuid] = (rowid, modified)
+        
+        # 2. Tasks whose checklist items or tags changed (affects derived text)
+        touched = set()
+        checklist_hwm = state.get("checklist_hwm")
+        if checklist_hwm is not None:
+            touched.update(uuid for uuid, in src.execute(
+                "SELECT DISTINCT task FROM TMChecklistItem WHERE userModificationDate > ?",
+                (checklist_hwm,),
+            ))
+        tags_fingerprint = self._tags_fingerprint(src)
+        if state.get("tags_fingerprint") not in (None, tags_fingerprint):
+            touched.update(uuid for uuid, in src.execute("SELECT DISTINCT tasks FROM TMTaskTag"))
+        # Kept whole: a touched task at the high-water mark is in candidates
+        # already but must still be re-applied below
+        for chunk in _chunks(sorted(touched - candidates.keys())):
+            marks = ", ".join("?" * len(chunk))
+            for uuid, rowid, modified in src.execute(
+                f"SELECT uuid, rowid, userModificationDate FROM TMTask WHERE uuid IN ({marks})", chunk
+            ):
+                candidates[uuid] = (rowid, modified)
+        stats["rows_scanned"] += len(candidates)
+        
+        changed = {}
+        if candidates:
+            load_known()
+            # Touched tasks are re-applied even though the task row is unchanged
+            changed = {
+                uuid: value for uuid, value in candidates.items()
+                if uuid in touched or uuid not in known or known[uuid][2] != value[1]
+            }
+        
+        # 3. Deletions / rows that appeared with an old modification date
+        deleted = set()
+        src_fingerprint = src.execute("SELECT count(*), total(rowid) FROM TMTask").fetchone()
+        known_fingerprint = self._known_fingerprint(sidecar, known, changed)
+        if full or hwm is None or tuple(src_fingerprint) != known_fingerprint:
+            stats["full_diff"] = True
+            load_known()
+            source = {uuid: (rowid, modified) for uuid, rowid, modified in src.execute(
+                "SELECT uuid, rowid, userModificationDate FROM TMTask"
+            )}
+            stats["rows_scanned"] += len(source)
+            deleted = known.keys() - source.keys()
+            for uuid, (rowid, modified) in source.items():
+                old = known.get(uuid)
+                if old is None or old[2] != modified:
+                    changed.setdefault(uuid, (rowid, modified))
+                elif old[1] != rowid:
+                    # Renumbered by VACUUM: content unchanged, only remap
+                    sidecar.execute("UPDATE sync_rows SET source_rowid = ? WHERE id = ?", (rowid, old[0]))
+        
+        # 4. Record rows, let the subclass update derived data, drop deleted rows
+        sidecar.executemany(
+            "INSERT INTO sync_rows (uuid, source_rowid, modified) VALUES (?, ?, ?) "
+            "ON CONFLICT(uuid) DO UPDATE SET source_rowid = excluded.source_rowid, "
+            "modified = excluded.modified",
+            [(uuid, rowid, modified) for uuid, (rowid, modified) in changed.items()],
+        )
+        changed_ids = self._ids(sidecar, list(changed))
+        deleted_ids = {uuid: known[uuid][0] for uuid in deleted}
+        if changed_ids or deleted_ids:
+            self._apply(sidecar, src, changed_ids, deleted_ids)
+        sidecar.executemany("DELETE FROM sync_rows WHERE id = ?", [(i,) for i in deleted_ids.values()])
+        stats["rows_applied"] = len(changed_ids)
+        stats["rows_deleted"] = len(deleted_ids)
+        
+        # 5. New high-water marks
+        task_hwm = src.execute("SELECT max(userModificationDate) FROM TMTask").fetchone()[0]
+        checklist_hwm = src.execute("SELECT max(userModificationDate) FROM TMChecklistItem").fetchone()[0]
+        self._set_state(
+            sidecar,
+            task_hwm=task_hwm or 0,
+            checklist_hwm=checklist_hwm or 0,
+            tags_fingerprint=tags_fingerprint,
+        )
+    
+    @staticmethod
+    def _tags_fingerprint(src: sqlite3.Connection) -> int:
+        """Checksum of tag uuids, titles and parents (TMTag has no modification date)."""
+        checksum = 0
+        for row in src.execute("SELECT uuid, title, parent FROM TMTag ORDER BY uuid"):
+            checksum = zlib.crc32(repr(row).encode(), checksum)
+        return checksum
+    
+    @staticmethod
+    def _known_fingerprint(
+        sidecar: sqlite3.Connection, known: Dict[str, Tuple], changed: Dict[str, Tuple[int, Any]]
+    ) -> Tuple[int, float]:
+        """(count, sum of rowids) sync_rows will have once `changed` is recorded."""
+        count, total = sidecar.execute("SELECT count(*), total(source_rowid) FROM sync_rows").fetchone()
+        for uuid, (rowid, _) in changed.items():
+            old = known.get(uuid)
+            if old is None:
+                count, total = count + 1, total + rowid
+            else:
+                total += rowid - old[1]
+        return count, total
+    
+    @staticmethod
+    def _ids(sidecar: sqlite3.Connection, uuids: List[str]) -> Dict[str, int]:
+        ids = {}
+        for chunk in _chunks(uuids):
+            marks = ", ".join("?" * len(chunk))
+            ids.update(sidecar.execute(f"SELECT uuid, id FROM sync_rows WHERE uuid IN ({marks})", chunk))
+        return ids
+
+
+# Text indexed per task: title, notes, tag titles and checklist item titles
+_SEARCH_DOCUMENTS_QUERY = """
+    SELECT t.uuid, t.title, t.notes,
+           (SELECT group_concat(g.title, ' ')
+              FROM TMTaskTag tt JOIN TMTag g ON g.uuid = tt.tags
+             WHERE tt.tasks = t.uuid),
+           (SELECT group_concat(c.title, ' ')
+              FROM TMChecklistItem c
+             WHERE c.task = t.uuid)
+    FROM TMTask t
+    WHERE t.trashed = 0
+      AND t.uuid IN ({marks})
+"""
+
+
+class SearchIndex(IncrementalSync):
+    """FTS5 full-text index over tasks, kept in a sidecar database.
+    
+    Things' main.sqlite must not be modified, so the index lives in a separate
+    SQLite file under the cache dir (one per Things database). It covers task
+    title, notes, tags and checklist items of non-trashed tasks and is
+    updated incrementally (see IncrementalSync). Read queries reach it
+    through the pool as the attached "search_index".
+    """
+    
+    name = "search-index"
+    
+    def _schema(self) -> str:
+        # FTS rowid = sync_rows.id, so updates and deletes are rowid lookups
+        return """
+            CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5(
+                uuid UNINDEXED, title, notes, tags, checklist,
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            );
+        """
+    
+    def _apply(
+        self, sidecar: sqlite3.Connection, src: sqlite3.Connection,
+        changed: Dict[str, int], deleted: Dict[str, int],
+    ) -> None:
+        sidecar.executemany(
+            "DELETE FROM task_fts WHERE rowid = ?",
+            [(i,) for i in list(changed.values()) + list(deleted.values())],
+        )
+        for chunk in _chunks(list(changed)):
+            query = _SEARCH_DOCUMENTS_QUERY.format(marks=", ".join("?" * len(chunk)))
+            sidecar.executemany(
+                "INSERT INTO task_fts (rowid, uuid, title, notes, tags, checklist) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(changed[row[0]],) + tuple(row) for row in src.execute(query, chunk)],
+            )
+    
+    def ensure_ready(self) -> bool:
+        """Sync the index and attach it to the pool; False if FTS5 can't be used."""
+        if not _fts5_available():
+            return False
+        try:
+            self.sync()
+        except (OSError, sqlite3.Error):
+            return False
+        self.manager.attach("search_index", self.path)
+        return True
+
+
+# Index used by search(), recreated when configure() swaps the pool
+_search_index: Optional[SearchIndex] = None
+
+
+def _ready_search_index() -> Optional[SearchIndex]:
+    """The shared search index if it is usable, else None (LIKE fallback)."""
+    global _search_index
+    if _search_index is None or _search_index.manager is not _manager:
+        _search_index = SearchIndex(_manager)
+    return _search_index if _search_index.ensure_ready() else None
+
+
+# ============== SNAPSHOT ==============
+
+# Seconds after which a snapshot refresh still marked as running is presumed dead
+SNAPSHOT_LOCK_TIMEOUT = 300
+
+# Open tasks as get() returns them (same columns as _get_query)
+_SNAPSHOT_TASKS_QUERY = f"""
+    SELECT uuid, title, notes, type, status, start, startDate, deadline,
+           project, area, heading, creationDate, userModificationDate, stopDate
+    FROM TMTask
+    WHERE trashed = 0
+      AND status = {STATUS_INCOMPLETE}
+"""
+
+
+class Snapshot:
+    """Pre-decoded copy of the list views and open tasks, in a file under the cache dir.
+    
+    Lets a one-shot CLI process answer today, inbox, upcoming, anytime,
+    someday, deadlines and get without opening main.sqlite: the file is
+    memory-mapped, a view is a single marshal.loads (or, for the default
+    --format json, text written as is), and a task is found by binary search
+    over a sorted uuid index. A snapshot is valid while
+    main.sqlite and its WAL keep their mtime and size (see _db_signature)
+    and the day it was built is still today.
+    
+    Layout: MAGIC, header size, the marshalled header, then the marshalled
+    views, the same views rendered as indented JSON, one marshalled record per
+    open task (in uuid order), and the index of fixed-width (uuid, offset,
+    length) entries.
+    """
+    
+    name = "snapshot"
+    MAGIC = b"T3SNAP02"
+    _PREFIX = struct.Struct("<8sI")
+    _ENTRY = struct.Struct("<QI")
+    
+    def __init__(self, manager: Optional[ConnectionManager] = None, path: Optional[str] = None):
+        self._manager = manager
+        self._path = path
+        self._map: Optional[mmap.mmap] = None
+        self._header: Dict[str, Any] = {}
+        self._base = 0
+    
+    @property
+    def manager(self) -> ConnectionManager:
+        return self._manager or _manager
+    
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            self._path = _sidecar_path(self.name, self.manager.path, ".bin")
+        return self._path
+    
+    def open(self) -> bool:
+        """Map the snapshot file; False if it is missing, unreadable or stale."""
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            magic, size = self._PREFIX.unpack_from(data)
+            header = marshal.loads(data[self._PREFIX.size:self._PREFIX.size + size]) if magic == self.MAGIC else {}
+        except (struct.error, ValueError, EOFError, TypeError):
+            header = {}
+        if (
+            header.get("signature") != _db_signature(self.manager.path)
+            or header.get("today") != _today_thingsdate()
+        ):
+            data.close()
+            return False
+        self._map, self._header, self._base = data, header, self._PREFIX.size + size
+        return True
+    
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+    
+    def _load(self, offset: int, length: int) -> Any:
+        start = self._base + offset
+        return marshal.loads(self._map[start:start + length])
+    
+    def view(self, name: str) -> List[Dict[str, Any]]:
+        """A list view exactly as the function of that name returns it."""
+        return self._load(*self._header["views"][name])
+    
+    def view_json(self, name: str) -> str:
+        """A list view as the CLI writes it with the default --format json."""
+        start, length = self._header["rendered"][name]
+        return self._map[self._base + start:self._base + start + length].decode()
+    
+    def get(self, uuid: str) -> Optional[Dict[str, Any]]:
+        """An open task as get() returns it; None if it is not in the snapshot."""
+        offset, count, width = self._header["index"]
+        key = uuid.encode()
+        if len(key) > width:
+            return None
+        key = key.ljust(width, b"\0")
+        step = width + self._ENTRY.size
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            at = self._base + offset + mid * step
+            entry = self._map[at:at + width]
+            if entry < key:
+                lo = mid + 1
+            elif entry > key:
+                hi = mid
+            else:
+                return self._load(*self._ENTRY.unpack_from(self._map, at + width))
+        return None
+    
+    def build(self) -> Dict[str, Any]:
+        """Write a fresh snapshot, atomically replacing the old one.
+        
+        Returns:
+            {"path", "tasks", "bytes", "ms"}
+        """
+        start = time.perf_counter()
+        # Taken before reading, so a write during the build leaves it stale
+        signature = _db_signature(self.manager.path)
+        today_int = _today_thingsdate()
+        with self.manager.connection() as conn:
+            views = _dashboard_views(conn, list(_DASHBOARD_VIEWS))
+            cursor = conn.execute(_SNAPSHOT_TASKS_QUERY)
+            decode = _cursor_decoder(cursor)
+            tasks = sorted((decode(row) for row in cursor), key=itemgetter("uuid"))
+        
+        chunks: List[bytes] = []
+        size = 0
+        
+        def append(blob: bytes) -> Tuple[int, int]:
+            nonlocal size
+            chunks.append(blob)
+            size += len(blob)
+            return size - len(blob), len(blob)
+        
+        view_at = {name: append(marshal.dumps(rows)) for name, rows in views.items()}
+        rendered_at = {}
+        for name, rows in views.items():
+            text = io.StringIO()
+            _write_json(rows, text)
+            rendered_at[name] = append(text.getvalue().encode())
+        record_at = [(task["uuid"].encode(), append(marshal.dumps(task))) for task in tasks]
+        width = max((len(uuid) for uuid, _ in record_at), default=1)
+        index_at = append(b"".join(uuid.ljust(width, b"\0") + self._ENTRY.pack(*at) for uuid, at in record_at))
+        header = marshal.dumps({
+            "signature": signature, "today": today_int, "views": view_at, "rendered": rendered_at,
+            "index": (index_at[0], len(record_at), width),
+        })
+        
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                f.write(self._PREFIX.pack(self.MAGIC, len(header)))
+                f.write(header)
+                f.writelines(chunks)
+            os.replace(temp, self.path)
+        finally:
+            if os.path.exists(temp):
+                os.unlink(temp)
+        return {
+            "path": self.path, "tasks": len(tasks), "bytes": self._PREFIX.size + len(header) + size,
+            "ms": round((time.perf_counter() - start) * 1e3, 1),
+        }
+    
+    def refresh_in_background(self) -> None:
+        """Rebuild in a detached `things3.py snapshot` process, unless one is running.
+        
+        The lock file created here is removed by that process when it is done.
+        """
+        lock = self.path + ".lock"
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(lock).st_mtime < SNAPSHOT_LOCK_TIMEOUT:
+                    return
+                os.utime(lock)
+            except OSError:
+                return
+        except OSError:
+            return
+        else:
+            os.close(fd)
+        try:
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "snapshot"],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                start_new_session=True, env=dict(os.environ, THINGS3_DB=self.manager.path),
+            )
+        except OSError:
+            os.unlink(lock)
+
+
+# ============== WATCH ==============
+
+# Seconds the database files must stay unchanged before a burst of writes is diffed
+WATCH_DEBOUNCE = 0.25
+
+# Seconds between stat checks when neither inotify nor kqueue is available
+WATCH_POLL_INTERVAL = 1.0
+
+# What ChangeFeed remembers per task: uuid, then (rowid, modified, status, trashed)
+_FEED_STATE_QUERY = "SELECT uuid, rowid, userModificationDate, status, trashed FROM TMTask"
+
+
+class ChangeFeed:
+    """Turns writes to the Things database into per-task events.
+    
+    Keeps the modification date, status and trashed flag of every task in
+    memory and, like IncrementalSync, reads only rows modified since the
+    high-water mark; removed rows are found by comparing (count, sum of
+    rowids) with the known rows, and only on a mismatch is the whole table
+    read. Task fields are then fetched for the changed rows alone.
+    
+    Events are get() dicts with "event" first, oldest change first:
+    - created: a task that was not there before
+    - completed / canceled: status changed to completed / canceled
+    - trashed: moved to the trash
+    - updated: any other change (including reopening and restoring)
+    - deleted: removed from the database ({"event", "uuid"} only)
+    """
+    
+    def __init__(self, manager: Optional[ConnectionManager] = None):
+        self._manager = manager
+        self._known: Dict[str, Tuple] = {}
+        self._fingerprint: Tuple[int, float] = (0, 0.0)
+        self._hwm: Optional[float] = None
+        self.signature: Optional[List[int]] = None
+    
+    @property
+    def manager(self) -> ConnectionManager:
+        return self._manager or _manager
+    
+    def changes(self) -> List[Dict[str, Any]]:
+        """Events since the previous call; the first call only records the current state."""
+        # Taken before reading, so a write during the diff is seen next time
+        self.signature = _db_signature(self.manager.path)
+        with self.manager.connection() as conn:
+            # One read transaction: every query sees the same snapshot
+            conn.execute("BEGIN")
+            try:
+                return self._diff(conn)
+            finally:
+                conn.rollback()
+    
+    def _diff(self, conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+        fingerprint = tuple(conn.execute("SELECT count(*), total(rowid) FROM TMTask").fetchone())
+        if self._hwm is None:
+            self._known = {row[0]: row[1:] for row in conn.execute(_FEED_STATE_QUERY)}
+            self._fingerprint = fingerprint
+            self._hwm = max((state[1] or 0 for state in self._known.values()), default=0)
+            return []
+        
+        changed = {
+            row[0]: row[1:]
+            for row in conn.execute(_FEED_STATE_QUERY + " WHERE userModificationDate >= ?", (self._hwm,))
+            if self._known.get(row[0]) != row[1:]
+        }
+        count, total = self._fingerprint
+        for uuid, state in changed.items():
+            old = self._known.get(uuid)
+            count, total = (count, total - old[0] + state[0]) if old else (count + 1, total + state[0])
+        deleted: List[str] = []
+        if fingerprint != (count, total):
+            # Rows were removed, or appeared with an old modification date
+            current = {row[0]: row[1:] for row in conn.execute(_FEED_STATE_QUERY)}
+            deleted = sorted(self._known.keys() - current.keys())
+            changed = {uuid: state for uuid, state in current.items() if self._known.get(uuid) != state}
+        
+        # Rows only renumbered (e.g. by VACUUM) are recorded without an event
+        kinds = {
+            uuid: self._kind(self._known.get(uuid), state)
+            for uuid, state in changed.items()
+            if uuid not in self._known or self._known[uuid][1:] != state[1:]
+        }
+        tasks: Dict[str, Dict[str, Any]] = {}
+        for chunk in _chunks(sorted(kinds)):
+            cursor = conn.execute(*_get_many_query(chunk))
+            decode = _cursor_decoder(cursor)
+            tasks.update((task["uuid"], task) for task in map(decode, cursor))
+        order = sorted(kinds, key=lambda uuid: (changed[uuid][1] or 0, uuid))
+        events = [{"event": kinds[uuid], **tasks[uuid]} for uuid in order]
+        events += [{"event": "deleted", "uuid": uuid} for uuid in deleted]
+        
+        for uuid in deleted:
+            del self._known[uuid]
+        self._known.update(changed)
+        self._fingerprint = fingerprint
+        self._hwm = max([self._hwm] + [state[1] for state in changed.values() if state[1] is not None])
+        return events
+    
+    @staticmethod
+    def _kind(old: Optional[Tuple], new: Tuple) -> str:
+        """Event name for a task going from state old (None: unknown) to new."""
+        if old is None:
+            return "created"
+        if new[3] and not old[3]:
+            return "trashed"
+        if new[2] != old[2] and new[2] == STATUS_COMPLETED:
+            return "completed"
+        if new[2] != old[2] and new[2] == STATUS_CANCELED:
+            return "canceled"
+        return "updated"
+
+
+class _PollWatcher:
+    """Wakes up every interval; watch() then compares file signatures."""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+    
+    def wait(self) -> None:
+        time.sleep(self.interval)
+    
+    def close(self) -> None:
+        pass
+
+
+class _InotifyWatcher:
+    """Linux: blocks until main.sqlite or its WAL is written, created or replaced.
+    
+    Watches the directory, since the WAL comes and goes; events for other
+    files (such as the -shm file readers touch) are skipped.
     """
-    cursor = conn.execute(query)
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    MASK = 0x2 | 0x8 | 0x80 | 0x100 | 0x200
+    _EVENT = struct.Struct("iIII")
+    
+    def __init__(self, db_path: str):
+        import ctypes
+        import ctypes.util
+        
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.names = {os.path.basename(db_path).encode(), os.path.basename(db_path).encode() + b"-wal"}
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(os.path.dirname(db_path) or "."), self.MASK) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+    
+    def wait(self) -> None:
+        while True:
+            data = os.read(self.fd, 65536)
+            at = 0
+            while at < len(data):
+                _, _, _, length = self._EVENT.unpack_from(data, at)
+                name = data[at + self._EVENT.size:at + self._EVENT.size + length].rstrip(b"\0")
+                at += self._EVENT.size + length
+                if name in self.names:
+                    return
+    
+    def close(self) -> None:
+        os.close(self.fd)
 
 
-def projects() -> List[Dict[str, Any]]:
-    """Get all projects."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               area, creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND type = 1
-          AND status = 0
-          AND rt1_recurrenceRule IS NULL
-        ORDER BY "index"
+class _KqueueWatcher:
+    """macOS/BSD: blocks until main.sqlite, its WAL or their directory changes.
+    
+    The directory is watched so a WAL created after start is picked up; files
+    are re-opened after every wake-up in case they were replaced.
     """
-    cursor = conn.execute(query)
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    
+    def __init__(self, db_path: str):
+        import select
+        
+        self.select = select
+        self.paths = [os.path.dirname(db_path) or ".", db_path, db_path + "-wal"]
+        self.kqueue = select.kqueue()
+        self.fds: Dict[str, int] = {}
+        self._register()
+    
+    def _register(self) -> None:
+        select = self.select
+        for fd in self.fds.values():
+            os.close(fd)
+        self.fds = {}
+        changes = []
+        for path in self.paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            self.fds[path] = fd
+            changes.append(select.kevent(
+                fd, filter=select.KQ_FILTER_VNODE, flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+                fflags=select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND | select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME,
+            ))
+        self.kqueue.control(changes, 0, 0)
+    
+    def wait(self) -> None:
+        self.kqueue.control(None, 16, None)
+        self._register()
+    
+    def close(self) -> None:
+        for fd in self.fds.values():
+            os.close(fd)
+        self.kqueue.close()
 
 
-def areas() -> List[Dict[str, Any]]:
-    """Get all areas."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title
-        FROM TMArea 
-        WHERE visible = 1
-        ORDER BY "index"
-    """
-    cursor = conn.execute(query)
-    result = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+def _file_watcher(db_path: str, poll_interval: float):
+    """inotify or kqueue if the platform has them, else stat polling."""
+    for watcher in (_InotifyWatcher, _KqueueWatcher):
+        try:
+            return watcher(db_path)
+        except (OSError, AttributeError, ImportError):
+            continue
+    return _PollWatcher(poll_interval)
 
 
-def tags() -> List[Dict[str, Any]]:
-    """Get all tags."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, shortcut, parent
-        FROM TMTag 
-        ORDER BY "index"
+def watch(debounce: float = WATCH_DEBOUNCE, poll_interval: float = WATCH_POLL_INTERVAL) -> Iterator[Dict[str, Any]]:
+    """Yield task events (see ChangeFeed) as Things writes to the database.
+    
+    Blocks between events; stop by breaking out of the loop. A wake-up
+    (inotify, kqueue or, without them, a poll every poll_interval) only
+    leads to a diff once the mtime and size of main.sqlite and its WAL
+    changed and then stayed unchanged for `debounce` seconds, so a burst of
+    writes becomes one diff.
+    
+    Example:
+        for event in watch():
+            print(event["event"], event["uuid"])
     """
-    cursor = conn.execute(query)
-    result = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    feed = ChangeFeed()
+    path = feed.manager.path
+    # Watching first: a write while the baseline is read still wakes us up
+    watcher = _file_watcher(path, poll_interval)
+    try:
+        feed.changes()
+        while True:
+            watcher.wait()
+            signature = _db_signature(path)
+            if signature == feed.signature:
+                continue
+            while True:
+                time.sleep(debounce)
+                current = _db_signature(path)
+                if current == signature:
+                    break
+                signature = current
+            start = time.perf_counter()
+            events = feed.changes()
+            if _trace_hooks:
+                _emit("watch", time.perf_counter() - start, rows=len(events))
+            yield from events
+    finally:
+        watcher.close()
 
 
-def completed(last_days: int = 7) -> List[Dict[str, Any]]:
-    """Get completed tasks from last N days."""
-    conn = _connect()
-    # Mac epoch timestamp for N days ago
-    mac_epoch = datetime(2001, 1, 1)
-    cutoff = (datetime.now() - mac_epoch).total_seconds() - (last_days * 86400)
+# ============== EXPORT AND DIFF ==============
+
+# Tables an export covers
+EXPORT_TABLES = ("TMTask", "TMArea", "TMTag")
+
+# Rows are split into this many buckets by hash of uuid; a diff holds one
+# bucket of each export in memory at a time
+EXPORT_BUCKETS = 256
+
+# Rows buffered while exporting before they are spilled to disk
+EXPORT_SPILL_ROWS = 20_000
+
+# Text values longer than this (in characters) and blobs are kept as a CRC-32
+EXPORT_INLINE_CHARS = 40
+
+
+def _fingerprint(row: tuple, keep: Optional[int]) -> bytes:
+    """A row as kept in an export: short values as is, long text and blobs as a CRC-32.
     
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               project, area, creationDate, userModificationDate, stopDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND status = 3
-          AND type = 0
-          AND stopDate > ?
-        ORDER BY stopDate DESC
+    Hashed values are 4-byte bytes objects, so they never equal a real
+    value; the column at index keep (the title) is always kept as is. The
+    tuple is marshalled with version 2, which has no back-references, so
+    equal rows give equal bytes and a diff compares rows as bytes.
     """
-    cursor = conn.execute(query, (cutoff,))
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    values = [
+        value if value is None or value.__class__ in (int, float)
+        or (value.__class__ is str and len(value) <= EXPORT_INLINE_CHARS)
+        else zlib.crc32(value if value.__class__ is bytes else value.encode()).to_bytes(4, "little")
+        for value in row
+    ]
+    if keep is not None:
+        values[keep] = row[keep]
+    return marshal.dumps(tuple(values), 2)
 
 
-def logbook() -> List[Dict[str, Any]]:
-    """Get logbook (completed and canceled tasks)."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               project, area, creationDate, userModificationDate, stopDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND (status = 3 OR status = 2)
-          AND type = 0
-        ORDER BY stopDate DESC
-        LIMIT 100
-    """
-    cursor = conn.execute(query)
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+def _bucket(uuid: str) -> int:
+    return zlib.crc32(uuid.encode()) % EXPORT_BUCKETS
 
 
-def search(query_str: str) -> List[Dict[str, Any]]:
-    """Search tasks by title or notes."""
-    conn = _connect()
-    pattern = f"%{query_str}%"
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               project, area, creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND (title LIKE ? OR notes LIKE ?)
-        ORDER BY userModificationDate DESC
-        LIMIT 50
+def export_fingerprints(path: str) -> Dict[str, Any]:
+    """Write a compact export of TMTask, TMArea and TMTag for diff_fingerprints().
+    
+    Every row is stored as its uuid plus one fingerprint per column (see
+    _fingerprint), so exports stay small and any change to a column shows
+    up. Rows are partitioned into EXPORT_BUCKETS buckets by uuid hash, each
+    stored as one zlib-compressed block; memory is bounded by
+    EXPORT_SPILL_ROWS buffered rows plus one bucket.
+    
+    Layout: MAGIC, the bucket blocks, the marshalled header (columns per
+    table, row counts, block offsets), then the header size.
+    
+    Returns:
+        {"path", "rows": {table: n}, "bytes", "ms"}
     """
-    cursor = conn.execute(query, (pattern, pattern))
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    start = time.perf_counter()
+    columns: Dict[str, List[str]] = {}
+    rows: Dict[str, int] = {}
+    chunks: List[List[Tuple[int, int]]] = [[] for _ in range(EXPORT_BUCKETS)]
+    with tempfile.TemporaryFile() as spill:
+        pending: List[List[tuple]] = [[] for _ in range(EXPORT_BUCKETS)]
+        buffered = 0
+        
+        def flush() -> None:
+            for bucket, records in enumerate(pending):
+                if records:
+                    blob = marshal.dumps(records)
+                    chunks[bucket].append((spill.tell(), len(blob)))
+                    spill.write(blob)
+                    records.clear()
+        
+        with _manager.connection() as conn:
+            # One read transaction: the tables are exported as of one moment
+            conn.execute("BEGIN")
+            try:
+                for table in EXPORT_TABLES:
+                    cursor = conn.execute(f"SELECT * FROM {table}")
+                    columns[table] = [d[0] for d in cursor.description]
+                    uuid_index = columns[table].index("uuid")
+                    title_index = columns[table].index("title") if "title" in columns[table] else None
+                    rows[table] = 0
+                    for batch in iter(lambda: cursor.fetchmany(DEFAULT_BATCH_SIZE), []):
+                        for row in batch:
+                            uuid = row[uuid_index]
+                            pending[_bucket(uuid)].append((table, uuid, _fingerprint(row, title_index)))
+                        rows[table] += len(batch)
+                        buffered += len(batch)
+                        if buffered >= EXPORT_SPILL_ROWS:
+                            flush()
+                            buffered = 0
+            finally:
+                conn.rollback()
+        flush()
+        
+        temp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp, "wb") as out:
+                out.write(_EXPORT_MAGIC)
+                blocks = []
+                for bucket_chunks in chunks:
+                    records: List[tuple] = []
+                    for offset, length in bucket_chunks:
+                        spill.seek(offset)
+                        records += marshal.loads(spill.read(length))
+                    block = zlib.compress(marshal.dumps(records), 1)
+                    blocks.append((out.tell(), len(block)))
+                    out.write(block)
+                header = marshal.dumps({
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "columns": columns, "rows": rows, "blocks": blocks,
+                })
+                out.write(header)
+                out.write(_EXPORT_TRAILER.pack(len(header)))
+                size = out.tell()
+            os.replace(temp, path)
+        finally:
+            if os.path.exists(temp):
+                os.unlink(temp)
+    return {"path": path, "rows": rows, "bytes": size, "ms": round((time.perf_counter() - start) * 1e3, 1)}
 
 
-def get(uuid: str) -> Optional[Dict[str, Any]]:
-    """Get a specific task by UUID."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               project, area, heading, creationDate, userModificationDate, stopDate
-        FROM TMTask 
-        WHERE uuid = ?
-    """
-    cursor = conn.execute(query, (uuid,))
-    row = cursor.fetchone()
-    conn.close()
-    return _row_to_dict(row) if row else None
+_EXPORT_MAGIC = b"T3EXPRT1"
+_EXPORT_TRAILER = struct.Struct("<I")
 
 
-def deadlines() -> List[Dict[str, Any]]:
-    """Get tasks with deadlines."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               project, area, creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND status = 0
-          AND type = 0
-          AND deadline IS NOT NULL
-        ORDER BY deadline
-    """
-    cursor = conn.execute(query)
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+class _ExportFile:
+    """Read side of export_fingerprints(): header up front, one bucket at a time."""
+    
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        try:
+            if self.file.read(len(_EXPORT_MAGIC)) != _EXPORT_MAGIC:
+                raise ValueError(f"not a things3 export: {path}")
+            self.file.seek(-_EXPORT_TRAILER.size, os.SEEK_END)
+            end = self.file.tell()
+            size, = _EXPORT_TRAILER.unpack(self.file.read(_EXPORT_TRAILER.size))
+            self.file.seek(end - size)
+            self.header = marshal.loads(self.file.read(size))
+        except (OSError, EOFError, TypeError, struct.error) as e:
+            self.file.close()
+            raise ValueError(f"not a things3 export: {path}") from e
+        except ValueError:
+            self.file.close()
+            raise
+    
+    def bucket(self, index: int) -> List[tuple]:
+        offset, length = self.header["blocks"][index]
+        self.file.seek(offset)
+        return marshal.loads(zlib.decompress(self.file.read(length)))
+    
+    def close(self) -> None:
+        self.file.close()
 
 
-def project_todos(project_uuid: str) -> List[Dict[str, Any]]:
-    """Get todos for a specific project."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               heading, creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND type = 0
-          AND project = ?
-        ORDER BY "index"
-    """
-    cursor = conn.execute(query, (project_uuid,))
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+def _changed_fields(old_columns: List[str], new_columns: List[str], old: bytes, new: bytes) -> Dict[str, Any]:
+    """{column: [old, new]} for differing columns; None where a value was kept hashed."""
+    old, new = marshal.loads(old), marshal.loads(new)
+    if old_columns == new_columns:
+        pairs = zip(new_columns, old, new)
+    else:
+        # Columns added or dropped between exports (e.g. after a Things update)
+        before = dict(zip(old_columns, old))
+        after = dict(zip(new_columns, new))
+        pairs = ((name, before.get(name), after.get(name)) for name in dict.fromkeys(old_columns + new_columns))
+    return {
+        name: None if a.__class__ is bytes or b.__class__ is bytes else [a, b]
+        for name, a, b in pairs if a != b
+    }
 
 
-def area_items(area_uuid: str) -> List[Dict[str, Any]]:
-    """Get todos and projects for a specific area."""
-    conn = _connect()
-    query = """
-        SELECT uuid, title, notes, type, status, start, startDate, deadline,
-               project, creationDate, userModificationDate
-        FROM TMTask 
-        WHERE trashed = 0 
-          AND area = ?
-          AND status = 0
-        ORDER BY type, "index"
+def diff_fingerprints(old_path: str, new_path: str) -> Iterator[Dict[str, Any]]:
+    """What changed between two exports (see export_fingerprints), lazily.
+    
+    Buckets are joined pairwise: one bucket of the old export goes into a
+    dict by (table, uuid) and the matching bucket of the new one is probed
+    against it. Rows are compared as bytes and only changed ones decoded;
+    memory stays at one bucket per export however large the exports are.
+    Changes come out in bucket order:
+    
+        {"change": "added" / "removed" / "modified", "table": "TMTask",
+         "uuid": ..., "title": ..., "fields": {column: [old, new]}}
+    
+    "fields" is only given for modified rows; a column whose value is too
+    long to be kept (notes, blobs) maps to None instead of [old, new].
     """
-    cursor = conn.execute(query, (area_uuid,))
-    result = [_row_to_dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return result
+    old, new = _ExportFile(old_path), _ExportFile(new_path)
+    try:
+        if len(old.header["blocks"]) != len(new.header["blocks"]):
+            raise ValueError("exports were written with different bucket counts")
+        old_columns, new_columns = old.header["columns"], new.header["columns"]
+        
+        def title(columns: Dict[str, List[str]], table: str, fingerprint: bytes) -> Optional[str]:
+            names = columns[table]
+            return marshal.loads(fingerprint)[names.index("title")] if "title" in names else None
+        
+        for index in range(len(new.header["blocks"])):
+            before = {(table, uuid): fingerprint for table, uuid, fingerprint in old.bucket(index)}
+            for table, uuid, fingerprint in new.bucket(index):
+                previous = before.pop((table, uuid), None)
+                if previous is None:
+                    yield {"change": "added", "table": table, "uuid": uuid,
+                           "title": title(new_columns, table, fingerprint)}
+                elif previous != fingerprint or old_columns[table] != new_columns[table]:
+                    fields = _changed_fields(old_columns[table], new_columns[table], previous, fingerprint)
+                    if fields:
+                        yield {"change": "modified", "table": table, "uuid": uuid,
+                               "title": title(new_columns, table, fingerprint), "fields": fields}
+            for (table, uuid), fingerprint in before.items():
+                yield {"change": "removed", "table": table, "uuid": uuid,
+                       "title": title(old_columns, table, fingerprint)}
+    finally:
+        old.close()
+        new.close()
 
 
 # ============== WRITE OPERATIONS (via URL Scheme) ==============
@@ -437,11 +3744,9 @@ def get_auth_token() -> Optional[str]:
     TMSettings table has only one row containing the auth token.
     """
     try:
-        conn = _connect()
         query = "SELECT uriSchemeAuthenticationToken FROM TMSettings LIMIT 1"
-        cursor = conn.execute(query)
-        row = cursor.fetchone()
-        conn.close()
+        with _manager.connection() as conn:
+            row = conn.execute(query).fetchone()
         return row[0] if row else None
     except Exception:
         return None
@@ -603,44 +3908,688 @@ def show(uuid: str = None, list_name: str = None) -> bool:
     return _run_url(url)
 
 
+# ============== DAEMON ==============
+
+# Worker threads of the query daemon (matches the pool's default max_idle)
+DAEMON_WORKERS = 4
+
+# Recent request latencies kept per command for the daemon's percentiles
+DAEMON_LATENCY_WINDOW = 1000
+
+
+def _socket_path() -> Optional[str]:
+    """Unix socket of the query daemon, or None if disabled.
+    
+    THINGS3_SOCKET overrides the default (daemon.sock in the cache
+    directory); set it to an empty string to never use the daemon. The
+    cache directory is not created: clients only look for an existing socket.
+    """
+    path = os.environ.get("THINGS3_SOCKET")
+    if path is None:
+        return os.path.join(_cache_dir(create=False), "daemon.sock")
+    return path or None
+
+
+def _send_message(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Write one message: a JSON object on a single line."""
+    sock.sendall(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+
+
+def _receive_message(sock: socket.socket) -> Dict[str, Any]:
+    """Read one message written by _send_message."""
+    with sock.makefile("rb") as stream:
+        line = stream.readline()
+    if not line:
+        raise ConnectionError("connection closed before a message was received")
+    return json.loads(line)
+
+
+def _daemon_request(path: str, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Send one request to the daemon; None if it is not reachable."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            _send_message(sock, request)
+            return _receive_message(sock)
+    except (OSError, ValueError):
+        return None
+
+
+class QueryDaemon:
+    """Resident process answering CLI requests over a Unix domain socket.
+    
+    Keeps the connection pool, compiled decoders, tag and title maps and the
+    search index warm between requests, so a CLI call through the daemon
+    skips the glob, connect and cache warm-up of a fresh process. Each
+    client connection carries one JSON request line and gets one JSON
+    response line; connections are handled by a pool of worker threads.
+    
+    Requests:
+        {"argv": [...], "stdin": str or None, "db": THINGS3_DB or None}
+            -> {"status": int, "stdout": str, "stderr": str, "ms": float}
+            (status None if the daemon serves another database)
+        {"op": "stats"} -> per-command request counts and latencies
+        {"op": "stop"} -> shut down after in-flight requests
+    
+    Usage:
+        QueryDaemon("/tmp/things3.sock").serve_forever()
+    """
+    
+    def __init__(self, path: str, workers: int = DAEMON_WORKERS):
+        self.path = path
+        self.workers = workers
+        self._parser = _build_parser()
+        self._db = os.environ.get("THINGS3_DB")
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._counts: Dict[str, List[int]] = {}  # command -> [requests, failures]
+        self._stopping = threading.Event()
+        self._started = time.time()
+    
+    def _bind(self) -> socket.socket:
+        """Listen on self.path, replacing a stale socket file."""
+        if os.path.exists(self.path):
+            if _daemon_request(self.path, {"op": "stats"}) is not None:
+                raise RuntimeError(f"a daemon is already listening on {self.path}")
+            os.unlink(self.path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        listener.listen(64)
+        listener.settimeout(0.5)  # wake up to notice stop()
+        return listener
+    
+    def serve_forever(self) -> None:
+        """Serve until stop() (or a stop request, SIGTERM or Ctrl-C)."""
+        # Imported here: it pulls in logging, which every CLI call would pay for
+        from concurrent.futures import ThreadPoolExecutor
+        
+        listener = self._bind()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="things3-daemon") as pool:
+                while not self._stopping.is_set():
+                    try:
+                        client, _ = listener.accept()
+                    except socket.timeout:
+                        continue
+                    client.settimeout(None)
+                    pool.submit(self._handle, client)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+    
+    def stop(self) -> None:
+        self._stopping.set()
+    
+    def warm_up(self) -> None:
+        """Open a connection and load the search index, tag and title maps."""
+        with _manager.connection() as conn:
+            _tag_index(conn)
+            _container_titles(conn)
+        _ready_search_index()
+    
+    def _handle(self, client: socket.socket) -> None:
+        start = time.perf_counter()
+        command = "-"
+        try:
+            with client:
+                request = _receive_message(client)
+                op = request.get("op")
+                if op == "stats":
+                    response = self.stats()
+                elif op == "stop":
+                    self.stop()
+                    response = {"status": 0}
+                else:
+                    command, response = self._run(request)
+                _send_message(client, response)
+                failed = bool(response.get("status"))
+        except (OSError, ValueError):
+            failed = True  # client went away or sent garbage
+        if command != "-":
+            self._record(command, time.perf_counter() - start, failed)
+    
+    def _run(self, request: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Run one CLI request; returns (command, response)."""
+        start = time.perf_counter()
+        if request.get("db") != self._db:
+            return "-", {"status": None, "error": "the daemon serves another database"}
+        out, err = io.StringIO(), io.StringIO()
+        command = "-"
+        try:
+            args = self._parser.parse_args(request["argv"])
+            command = args.command or "-"
+            status = _run_command(self._parser, args, out, err, io.StringIO(request.get("stdin") or ""))
+        except SystemExit as e:  # argparse; the client validated argv already
+            status = e.code if isinstance(e.code, int) else 2
+        except Exception as e:
+            err.write(f"Error: {e}\n")
+            status = 1
+        elapsed = (time.perf_counter() - start) * 1e3
+        return command, {"status": status, "stdout": out.getvalue(), "stderr": err.getvalue(), "ms": elapsed}
+    
+    def _record(self, command: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            latencies = self._latencies.get(command)
+            if latencies is None:
+                latencies = self._latencies[command] = deque(maxlen=DAEMON_LATENCY_WINDOW)
+                self._counts[command] = [0, 0]
+            latencies.append(seconds * 1e3)
+            self._counts[command][0] += 1
+            self._counts[command][1] += failed
+    
+    def stats(self) -> Dict[str, Any]:
+        """Requests and failures per command, with latency percentiles (ms)
+        over the last DAEMON_LATENCY_WINDOW requests, receive to reply."""
+        with self._lock:
+            snapshot = {command: sorted(latencies) for command, latencies in self._latencies.items()}
+            counts = {command: list(c) for command, c in self._counts.items()}
+        
+        def percentile(ordered: List[float], pct: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 3)
+        
+        return {
+            "pid": os.getpid(),
+            "socket": self.path,
+            "workers": self.workers,
+            "uptime_s": round(time.time() - self._started, 1),
+            "result_cache": result_cache_info(),
+            "commands": {
+                command: {
+                    "requests": counts[command][0],
+                    "failures": counts[command][1],
+                    "p50_ms": percentile(ordered, 50),
+                    "p95_ms": percentile(ordered, 95),
+                    "max_ms": round(ordered[-1], 3),
+                }
+                for command, ordered in snapshot.items()
+            },
+        }
+
+
+def _serve_command(args: argparse.Namespace, out) -> int:
+    """things3.py serve: run the daemon, or query/stop a running one."""
+    path = args.socket or _socket_path()
+    if not path:
+        print("Error: THINGS3_SOCKET is empty (daemon disabled)", file=sys.stderr)
+        return 1
+    if args.stats or args.stop:
+        response = _daemon_request(path, {"op": "stats" if args.stats else "stop"})
+        if response is None:
+            print(f"Error: no daemon listening on {path}", file=sys.stderr)
+            return 1
+        if args.stats:
+            _write_json(response, out)
+        return 0
+    daemon = QueryDaemon(path, args.workers)
+    try:
+        daemon.warm_up()
+        print(f"things3 daemon listening on {path} ({args.workers} workers)", file=sys.stderr)
+        daemon.serve_forever()
+    except (RuntimeError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
 # ============== CLI ==============
 
-if __name__ == "__main__":
-    import sys
-    
-    commands = {
-        "today": today,
-        "inbox": inbox,
-        "upcoming": upcoming,
-        "anytime": anytime,
-        "someday": someday,
-        "projects": projects,
-        "areas": areas,
-        "tags": tags,
-        "deadlines": deadlines,
-        "logbook": logbook,
-    }
+def _write_json(result: Any, out) -> None:
+    """Write a result as indented JSON, streaming lists and iterators row by row.
     
-    if len(sys.argv) < 2:
-        print("Usage: things3.py <command> [args]")
-        print(f"Commands: {', '.join(commands.keys())}, search <query>, get <uuid>")
-        sys.exit(1)
+    The output is identical to print(json.dumps(result, indent=2)), but rows
+    are written as they are decoded instead of building one big string.
+    """
+    if result is None or isinstance(result, dict):
+        out.write(json.dumps(result, indent=2, ensure_ascii=False))
+        out.write("\n")
+        return
+    empty = True
+    for row in result:
+        out.write(",\n  " if not empty else "[\n  ")
+        # JSON strings never contain raw newlines, so indenting by replace is safe
+        out.write(json.dumps(row, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+        empty = False
+    out.write("[]\n" if empty else "\n]\n")
+
+
+def _write_compact(result: Any, out) -> None:
+    """Write a result as single-line JSON, streaming lists and iterators."""
+    if result is None or isinstance(result, dict):
+        out.write(json.dumps(result, ensure_ascii=False, separators=(",", ":")))
+        out.write("\n")
+        return
+    out.write("[")
+    separator = ""
+    for row in result:
+        out.write(separator)
+        out.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+        separator = ","
+    out.write("]\n")
+
+
+def _write_ndjson(result: Any, out) -> None:
+    """Write one JSON record per line (a single object is one record, None is none).
+    
+    Output is flushed after the first record so consumers can start right away.
+    """
+    if result is None:
+        return
+    if isinstance(result, dict):
+        result = [result]
+    first = True
+    for row in result:
+        out.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+        out.write("\n")
+        if first:
+            out.flush()
+            first = False
+
+
+# Output writers by --format
+_WRITERS = {"json": _write_json, "compact": _write_compact, "ndjson": _write_ndjson}
+
+# Commands without arguments: name -> (read function, streaming variant)
+_LIST_COMMANDS = {
+    "today": (today, iter_today),
+    "inbox": (inbox, iter_inbox),
+    "upcoming": (upcoming, iter_upcoming),
+    "anytime": (anytime, iter_anytime),
+    "someday": (someday, iter_someday),
+    "projects": (projects, iter_projects),
+    "areas": (areas, iter_areas),
+    "tags": (tags, iter_tags),
+    "deadlines": (deadlines, iter_deadlines),
+    "logbook": (logbook, iter_logbook),
+}
+
+# List commands taking --tag/--any-tag/--not-tag/--expand-tags
+_TAG_FILTERED_COMMANDS = ("today", "upcoming", "anytime", "someday", "deadlines")
+
+
+def _traced_writer(write: Callable[[Any, Any], None], command: str) -> Callable[[Any, Any], None]:
+    """Wrap a writer to emit a serialize span.
+    
+    Streaming writers pull rows while writing, so time spent in spans emitted
+    meanwhile (connect, execute, decode, query plans) is subtracted.
+    """
+    def traced(result: Any, out) -> None:
+        inner = _InnerSpans()
+        add_trace_hook(inner)
+        start = time.perf_counter()
+        try:
+            write(result, out)
+        finally:
+            remove_trace_hook(inner)
+            elapsed = time.perf_counter() - start - inner.ms / 1e3
+            _emit("serialize", max(0.0, elapsed), call=command)
+    
+    return traced
+
+
+class _InnerSpans:
+    """Trace hook summing the ms of this thread's spans while a writer runs."""
+    
+    thread_bound = True
+    
+    def __init__(self):
+        self.ms = 0.0
+        self._thread = threading.get_ident()
     
-    cmd = sys.argv[1]
-    
-    if cmd in commands:
-        result = commands[cmd]()
-        print(json.dumps(result, indent=2, ensure_ascii=False))
-    elif cmd == "search" and len(sys.argv) > 2:
-        result = search(sys.argv[2])
-        print(json.dumps(result, indent=2, ensure_ascii=False))
-    elif cmd == "get" and len(sys.argv) > 2:
-        result = get(sys.argv[2])
-        print(json.dumps(result, indent=2, ensure_ascii=False))
-    elif cmd == "completed":
-        days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
-        result = completed(days)
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+    def __call__(self, record: Dict[str, Any]) -> None:
+        if record["span"] != "call" and threading.get_ident() == self._thread:
+            self.ms += record["ms"] + record.get("plan_ms", 0)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the CLI argument parser."""
+    # Options accepted both before and after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--format", choices=sorted(_WRITERS), default=argparse.SUPPRESS,
+        help="json (indented, default), compact (single-line JSON) or ndjson (one record per line)",
+    )
+    common.add_argument(
+        "--profile", action="store_true", default=argparse.SUPPRESS,
+        help="print per-stage timings (glob, connect, execute, decode, serialize) to stderr on exit",
+    )
+    
+    parser = argparse.ArgumentParser(
+        prog="things3.py", description="Read Things 3 data as JSON.", parents=[common]
+    )
+    # Keyset pagination for logbook, completed and search
+    paged = argparse.ArgumentParser(add_help=False)
+    paged.add_argument(
+        "--page-size", type=int, metavar="N",
+        help="return one page of N items as {items, next_page_token}",
+    )
+    paged.add_argument(
+        "--page-token", metavar="TOKEN", help="continue after a previous page's next_page_token"
+    )
+    
+    # Commands that return tasks
+    enriched = argparse.ArgumentParser(add_help=False)
+    enriched.add_argument("--tags", action="store_true", help="include each task's tag titles")
+    enriched.add_argument("--checklist", action="store_true", help="include each task's checklist items")
+    enriched.add_argument(
+        "--progress", action="store_true", help="include checklist progress as {done, total}"
+    )
+    enriched.add_argument(
+        "--expand", action="store_true", help="include project, area and heading titles next to their uuids"
+    )
+    # Tag filters for today, upcoming, anytime, someday, deadlines and search
+    tag_filtered = argparse.ArgumentParser(add_help=False)
+    tag_filtered.add_argument(
+        "--tag", action="append", dest="all_tags", metavar="TAG", help="only tasks with this tag (repeatable: all of them)"
+    )
+    tag_filtered.add_argument(
+        "--any-tag", action="append", dest="any_tags", metavar="TAG", help="only tasks with at least one of these tags"
+    )
+    tag_filtered.add_argument(
+        "--not-tag", action="append", dest="exclude_tags", metavar="TAG", help="leave out tasks with this tag"
+    )
+    tag_filtered.add_argument(
+        "--expand-tags", action="store_true", help="let each tag also match the tags nested below it"
+    )
+    
+    sub = parser.add_subparsers(dest="command", metavar="<command>")
+    for name, (func, _) in _LIST_COMMANDS.items():
+        parents = [common] if name in ("areas", "tags") else [common, enriched]
+        if name in _TAG_FILTERED_COMMANDS:
+            parents.append(tag_filtered)
+        if name == "logbook":
+            parents.append(paged)
+        sub.add_parser(name, parents=parents, help=f"same as {func.__name__}()")
+    p = sub.add_parser(
+        "search", parents=[common, enriched, tag_filtered, paged], help="search by title/notes/tags/checklist"
+    )
+    p.add_argument("query")
+    p.add_argument(
+        "--like", action="store_true", help="plain LIKE scan of title/notes instead of the search index"
+    )
+    p = sub.add_parser(
+        "get", parents=[common, enriched],
+        help="get a task by UUID; several UUIDs (or - / none: read from stdin) return {items, missing}",
+    )
+    p.add_argument("uuids", nargs="*", metavar="uuid")
+    p = sub.add_parser("completed", parents=[common, enriched, paged], help="completed in the last N days")
+    p.add_argument("days", nargs="?", type=int, default=7)
+    p = sub.add_parser(
+        "dashboard", parents=[common, enriched], help="today, inbox, upcoming, anytime, someday and deadlines at once"
+    )
+    p.add_argument(
+        "--views", type=lambda v: v.split(","), metavar="VIEW,...",
+        help=f"subset of {','.join(_DASHBOARD_VIEWS)}",
+    )
+    sub.add_parser("counts", parents=[common], help="number of items per list, project and area")
+    p = sub.add_parser("tree", parents=[common], help="areas > projects > headings > to-dos, nested")
+    p.add_argument("--all", action="store_true", help="include completed and canceled tasks")
+    p.add_argument("--checklist", action="store_true", help="include checklist items")
+    p.add_argument("--tags", action="store_true", help="include tag titles")
+    p = sub.add_parser(
+        "serve", help="keep a warm query daemon on a Unix socket; other commands then use it"
+    )
+    p.add_argument("--socket", metavar="PATH", help="socket path (default: THINGS3_SOCKET or the cache dir)")
+    p.add_argument("--workers", type=int, default=DAEMON_WORKERS, help="concurrent requests")
+    p.add_argument("--stats", action="store_true", help="print a running daemon's per-command latencies")
+    p.add_argument("--stop", action="store_true", help="stop a running daemon")
+    sub.add_parser(
+        "snapshot", help="rebuild the snapshot used with THINGS3_SNAPSHOT=1 (list views and open tasks)"
+    )
+    p = sub.add_parser(
+        "watch", help="print created/updated/completed/canceled/trashed/deleted task events as NDJSON"
+    )
+    p.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE, metavar="SECONDS",
+                   help="quiet time before a burst of writes is diffed")
+    p.add_argument("--interval", type=float, default=WATCH_POLL_INTERVAL, metavar="SECONDS",
+                   help="stat polling period where inotify/kqueue are unavailable")
+    p = sub.add_parser("export", help="write a compact fingerprint export of tasks, areas and tags for diff")
+    p.add_argument("path", metavar="FILE")
+    p = sub.add_parser("diff", help="print added/removed/modified items between two exports as NDJSON")
+    p.add_argument("old", metavar="OLD")
+    p.add_argument("new", metavar="NEW", nargs="?", help="default: the database as it is now")
+    p.add_argument("--summary", action="store_true", help="print counts per table and change instead")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None, out=None) -> int:
+    """Run the CLI and return the exit status.
+    
+    Read commands go through the query daemon when its socket exists (see
+    QueryDaemon), and run in this process otherwise or if it fails. With
+    THINGS3_SNAPSHOT=1 plain list views and get are answered from the
+    Snapshot when it is fresh.
+    """
+    out = out or sys.stdout
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        return _serve_command(args, out)
+    if args.command == "snapshot":
+        return _snapshot_command(out)
+    if args.command == "watch":
+        return _watch_command(args, out)
+    if args.command == "export":
+        return _export_command(args, out)
+    if args.command == "diff":
+        return _diff_command(args, out)
+    stdin = sys.stdin
+    try:
+        socket_path = _socket_path() if args.command else None
+        use_daemon = bool(socket_path) and os.path.exists(socket_path)
+    except OSError:
+        # No usable cache dir (e.g. $HOME unset or read-only): run locally
+        use_daemon = False
+    if use_daemon:
+        # The daemon cannot read our stdin: send what get would read
+        text = sys.stdin.read() if _reads_stdin(args) else None
+        response = _daemon_request(socket_path, {
+            "argv": argv, "stdin": text, "db": os.environ.get("THINGS3_DB"),
+        })
+        if response is not None and response.get("status") is not None:
+            out.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            return response["status"]
+        if text is not None:
+            stdin = io.StringIO(text)
+    # Each result is read once here: storing it in the result cache is wasted work
+    configure_result_cache(max_entries=0)
+    if os.environ.get("THINGS3_SNAPSHOT") == "1":
+        status = _run_from_snapshot(args, out)
+        if status is not None:
+            return status
+    return _run_command(parser, args, out, sys.stderr, stdin)
+
+
+def _reads_stdin(args: argparse.Namespace) -> bool:
+    """Whether the command reads its input from stdin (get with no uuids or -)."""
+    return args.command == "get" and (not args.uuids or args.uuids == ["-"])
+
+
+def _command_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Enrichment flags and tag filters given, as keyword arguments of the read functions."""
+    options: Dict[str, Any] = {
+        f"include_{flag}": True for flag in ("tags", "checklist", "progress") if getattr(args, flag, False)
+    }
+    if getattr(args, "expand", False):
+        options["expand"] = True
+    if args.command == "search" or args.command in _TAG_FILTERED_COMMANDS:
+        tag_filters = {
+            "all_tags": args.all_tags, "any_tags": args.any_tags,
+            "exclude_tags": args.exclude_tags, "expand_tags": args.expand_tags,
+        }
+        options.update((name, value) for name, value in tag_filters.items() if value)
+    return options
+
+
+def _run_from_snapshot(args: argparse.Namespace, out) -> Optional[int]:
+    """Answer a plain list view or single get from the Snapshot (THINGS3_SNAPSHOT=1).
+    
+    Returns None if the command has to read the database instead; a stale
+    snapshot is then rebuilt in the background for the next call.
+    """
+    if args.command not in _DASHBOARD_VIEWS and args.command != "get":
+        return None
+    if _command_options(args) or getattr(args, "profile", False) or _process_trace_hooks():
+        return None
+    if args.command == "get" and (_reads_stdin(args) or len(args.uuids) != 1):
+        return None
+    snapshot = Snapshot()
+    if not snapshot.open():
+        snapshot.refresh_in_background()
+        return None
+    write = _WRITERS[getattr(args, "format", "json")]
+    try:
+        if args.command == "get":
+            result = snapshot.get(args.uuids[0])
+        elif write is _write_json:
+            # Rendered at build time: the indented encoder is the slow part
+            out.write(snapshot.view_json(args.command))
+            return 0
+        else:
+            result = snapshot.view(args.command)
+    finally:
+        snapshot.close()
+    if result is None:
+        # Not an open task: completed, trashed or unknown
+        return None
+    write(result, out)
+    return 0
+
+
+def _snapshot_command(out) -> int:
+    """Build the snapshot now and report it (the background refresh runs this too)."""
+    snapshot = Snapshot()
+    try:
+        _write_json(snapshot.build(), out)
+    finally:
+        try:
+            os.unlink(snapshot.path + ".lock")
+        except OSError:
+            pass
+    return 0
+
+
+def _watch_command(args: argparse.Namespace, out) -> int:
+    """Print task events as NDJSON until interrupted."""
+    try:
+        for event in watch(args.debounce, args.interval):
+            out.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+            out.write("\n")
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _export_command(args: argparse.Namespace, out) -> int:
+    """Write an export and report its size and row counts."""
+    try:
+        result = export_fingerprints(args.path)
+    except OSError as e:
+        # Output path missing or not writable
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    _write_json(result, out)
+    return 0
+
+
+def _diff_command(args: argparse.Namespace, out) -> int:
+    """Print the changes between two exports (or an export and the database) as NDJSON."""
+    if args.new is None:
+        fd, new = tempfile.mkstemp(prefix="things3-export-", dir=_cache_dir())
+        os.close(fd)
     else:
-        print(f"Unknown command: {cmd}")
+        new = args.new
+    try:
+        if args.new is None:
+            export_fingerprints(new)
+        summary: Dict[str, Dict[str, int]] = {}
+        for change in diff_fingerprints(args.old, new):
+            if args.summary:
+                counts = summary.setdefault(change["table"], {"added": 0, "removed": 0, "modified": 0})
+                counts[change["change"]] += 1
+                continue
+            out.write(json.dumps(change, ensure_ascii=False, separators=(",", ":")))
+            out.write("\n")
+    except (OSError, ValueError) as e:
+        # A missing or foreign file given as an export
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.new is None:
+            os.unlink(new)
+    if args.summary:
+        _write_json(summary, out)
+    return 0
+
+
+def _run_command(parser: argparse.ArgumentParser, args: argparse.Namespace, out, err, stdin) -> int:
+    """Run a parsed read command in this process, writing to out and err."""
+    write = _WRITERS[getattr(args, "format", "json")]
+    paging = getattr(args, "page_size", None) is not None or getattr(args, "page_token", None)
+    page_size = getattr(args, "page_size", None) or 100
+    options = _command_options(args)
+    profile = _Profile() if getattr(args, "profile", False) else None
+    # Other daemon requests' --profile hooks do not make this one traced
+    if profile or _process_trace_hooks():
+        write = _traced_writer(write, args.command or "-")
+    if profile:
+        add_trace_hook(profile)
+    # Output is streamed from the iter_* functions, unless results are cached
+    # (in the query daemon, which buffers the output anyway)
+    streaming = _result_cache.max_entries <= 0
+    
+    try:
+        if paging and args.command == "logbook":
+            write(logbook_page(page_size, args.page_token, **options), out)
+        elif paging and args.command == "completed":
+            write(completed_page(args.days, page_size, args.page_token, **options), out)
+        elif paging and args.command == "search":
+            write(search_page(args.query, page_size, args.page_token, fts=not args.like, **options), out)
+        elif args.command in _LIST_COMMANDS:
+            listed, streamed = _LIST_COMMANDS[args.command]
+            write((streamed if streaming else listed)(**options), out)
+        elif args.command == "search":
+            write((iter_search if streaming else search)(args.query, fts=not args.like, **options), out)
+        elif args.command == "get" and not _reads_stdin(args) and len(args.uuids) == 1:
+            write(get(args.uuids[0], **options), out)
+        elif args.command == "get":
+            uuids = stdin.read().split() if _reads_stdin(args) else args.uuids
+            write(get_many(uuids, **options), out)
+        elif args.command == "completed":
+            write(iter_completed(args.days, **options), out)
+        elif args.command == "dashboard":
+            write(dashboard(args.views, **options), out)
+        elif args.command == "counts":
+            write(counts(), out)
+        elif args.command == "tree":
+            write((iter_tree if streaming else tree)(not args.all, args.checklist, args.tags), out)
+        else:
+            parser.print_help(out)
+            return 1
+    except ValueError as e:
+        # Bad user input, e.g. a malformed page token
+        print(f"Error: {e}", file=err)
+        return 1
+    finally:
+        if profile:
+            remove_trace_hook(profile)
+            profile.write(err)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # Reader went away (e.g. piped into head); silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
         sys.exit(1)